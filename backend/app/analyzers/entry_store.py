@@ -0,0 +1,307 @@
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.models.entry import ERROR, LEVELS, ParsedEntry
+from app.analyzers.templates import TemplateMiner
+from app.analyzers.time_series import moment_epochs
+from app.config import ENTRY_STORE_PATH, ENTRY_STORE_MAX_DATASETS
+
+# (timestamp, epoch seconds, level code, source, error pattern, message, malformed)
+Row = Tuple[Optional[str], Optional[int], int, Optional[str], Optional[str], str, int]
+
+# Stored in PRAGMA user_version; a file with another version is emptied and recreated.
+SCHEMA_VERSION = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    writers INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    dataset INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp TEXT,
+    epoch INTEGER,
+    level INTEGER NOT NULL,
+    source TEXT,
+    pattern TEXT,
+    message TEXT NOT NULL,
+    malformed INTEGER NOT NULL,
+    PRIMARY KEY (dataset, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_level ON entries (dataset, level);
+CREATE INDEX IF NOT EXISTS entries_source ON entries (dataset, source);
+CREATE INDEX IF NOT EXISTS entries_time ON entries (dataset, epoch);
+CREATE INDEX IF NOT EXISTS entries_pattern ON entries (dataset, pattern) WHERE pattern IS NOT NULL;
+"""
+
+def connect(path: str) -> sqlite3.Connection:
+    # Analysis workers in other processes write to the same file.
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        migrate(db)
+    return db
+
+def migrate(db: sqlite3.Connection) -> None:
+    """Recreate the tables for this ``SCHEMA_VERSION``, dropping stored entries
+    of an older one. The version is checked again under the write lock, so
+    processes starting together migrate once."""
+    db.isolation_level = None
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            db.execute("DROP TABLE IF EXISTS entries")
+            db.execute("DROP TABLE IF EXISTS datasets")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    db.execute(statement)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    finally:
+        db.isolation_level = ""
+
+def entry_rows(entries: List[ParsedEntry], patterns: Iterable[str]) -> List[Row]:
+    """Rows for a block of entries; ``patterns`` are the masked messages of its errors, in order."""
+    patterns = iter(patterns)
+    epochs = iter(moment_epochs([entry.moment for entry in entries if entry.moment is not None]))
+    return [
+        (entry.timestamp, next(epochs) if entry.moment is not None else None, entry.level_code, entry.source,
+         next(patterns) if entry.level_code == ERROR else None, entry.message, int(entry.malformed))
+        for entry in entries
+    ]
+
+class EntryBuffer:
+    """Rows kept in memory by a shard accumulator until it is merged in order."""
+
+    def __init__(self):
+        self.rows: List[Row] = []
+
+    def write(self, rows: List[Row]) -> None:
+        self.rows.extend(rows)
+
+    def inherit_leading(self, count: int, moment: datetime) -> None:
+        """Give the first ``count`` rows, which had no timestamp, the time of the previous shard."""
+        timestamp = moment.isoformat()
+        epoch = moment_epochs([moment])[0]
+        for i in range(count):
+            self.rows[i] = (timestamp, epoch) + self.rows[i][2:]
+
+class EntryWriter:
+    """Appends rows to one dataset of the entry store, numbering them in order.
+
+    An open writer counts in the dataset's ``writers``, which keeps it from
+    being evicted until ``close``. If the dataset is deleted anyway (through
+    ``DELETE /entries``), ``lost`` is set and later rows are dropped.
+    """
+
+    def __init__(self, dataset_id: str, path: str = ENTRY_STORE_PATH):
+        self.dataset_id = dataset_id
+        self.lost = False
+        self.db = connect(path)
+        with self.db:
+            self.db.execute("UPDATE datasets SET writers = writers + 1 WHERE name = ?", (dataset_id,))
+            row = self.db.execute("SELECT id, rows FROM datasets WHERE name = ?", (dataset_id,)).fetchone()
+        if row is None:
+            self.db.close()
+            raise KeyError(dataset_id)
+        self.dataset, self.rows = row
+
+    def write(self, rows: List[Row]) -> None:
+        if not rows or self.lost:
+            return
+        dataset, start = self.dataset, self.rows
+        with self.db:
+            updated = self.db.execute("UPDATE datasets SET rows = ? WHERE id = ?", (start + len(rows), dataset))
+            if updated.rowcount == 0:
+                self.lost = True
+                return
+            self.db.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(dataset, start + i) + row for i, row in enumerate(rows)],
+            )
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        with self.db:
+            self.db.execute("UPDATE datasets SET writers = writers - 1 WHERE id = ?", (self.dataset,))
+        self.db.close()
+
+@contextmanager
+def entry_writer(dataset_id: Optional[str]) -> Iterator[Optional[EntryWriter]]:
+    """A writer for ``dataset_id``, closed afterwards; ``None`` when nothing is stored."""
+    if dataset_id is None:
+        yield None
+        return
+    writer = EntryWriter(dataset_id)
+    try:
+        yield writer
+    finally:
+        writer.close()
+
+def time_range(hour: Optional[datetime], since: Optional[datetime],
+               until: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+    """Epoch seconds ``[start, end)`` of the ``/entries`` time filters; ``None`` is unbounded."""
+    bounds = [(since, until)]
+    if hour is not None:
+        hour_start = hour.replace(minute=0, second=0, microsecond=0)
+        bounds.append((hour_start, hour_start + timedelta(hours=1)))
+    starts = [moment_epochs([low])[0] for low, _ in bounds if low is not None]
+    ends = [moment_epochs([high])[0] for _, high in bounds if high is not None]
+    return (max(starts) if starts else None), (min(ends) if ends else None)
+
+class EntryStore:
+    """Parsed entries of past analyses in SQLite, for filtering without re-parsing.
+
+    Each analysis run with ``store`` enabled writes its entries to a new
+    dataset, indexed by level, source, time and error pattern (the masked
+    error message behind ``topErrors``). Only the newest ``max_datasets``
+    datasets are kept, plus older ones that still have an open writer; those
+    go once a later ``create`` finds them closed. Entries whose dataset is
+    gone are removed when the store opens.
+    """
+
+    def __init__(self, path: str = ENTRY_STORE_PATH, max_datasets: int = ENTRY_STORE_MAX_DATASETS):
+        self.path = path
+        self.max_datasets = max_datasets
+        self.db = connect(path)
+        self.lock = threading.Lock()
+        # dataset -> (rows when mined, {template: [patterns]})
+        self.templates: Dict[int, Tuple[int, Dict[str, List[str]]]] = {}
+        with self.db:
+            self.db.execute("DELETE FROM entries WHERE dataset NOT IN (SELECT id FROM datasets)")
+
+    def create(self) -> str:
+        dataset_id = uuid.uuid4().hex
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO datasets (name, created) VALUES (?, ?)", (dataset_id, time.time()))
+            stale = self.db.execute(
+                "SELECT id FROM (SELECT id, writers FROM datasets ORDER BY id DESC LIMIT -1 OFFSET ?) "
+                "WHERE writers <= 0", (self.max_datasets,)
+            ).fetchall()
+            for (dataset,) in stale:
+                self.db.execute("DELETE FROM entries WHERE dataset = ?", (dataset,))
+                self.db.execute("DELETE FROM datasets WHERE id = ?", (dataset,))
+                self.templates.pop(dataset, None)
+        return dataset_id
+
+    def info(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._dataset(dataset_id)
+        if row is None:
+            return None
+        return {"datasetId": dataset_id, "createdAt": row[1], "rows": row[2]}
+
+    def delete(self, dataset_id: str) -> bool:
+        with self.lock, self.db:
+            row = self._dataset(dataset_id)
+            if row is None:
+                return False
+            self.db.execute("DELETE FROM entries WHERE dataset = ?", (row[0],))
+            self.db.execute("DELETE FROM datasets WHERE id = ?", (row[0],))
+            self.templates.pop(row[0], None)
+            return True
+
+    def query(self, dataset_id: str, level: Optional[str] = None, source: Optional[str] = None,
+              hour: Optional[datetime] = None, template: Optional[str] = None, contains: Optional[str] = None,
+              after: int = -1, offset: int = 0, limit: int = 100, since: Optional[datetime] = None,
+              until: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Matching entries in log order, and how many match in total.
+
+        Pages continue either by ``offset`` or, in constant time per page,
+        by passing the previous page's ``next`` as ``after``. ``template`` is
+        a ``topErrors`` message. ``since`` (inclusive) and ``until``
+        (exclusive) bound the time in whole seconds, and ``hour`` selects
+        the clock hour that contains it; naive times count as UTC, as in
+        the time series. Returns ``None`` for an unknown dataset.
+        """
+        start, end = time_range(hour, since, until)
+        with self.lock:
+            row = self._dataset(dataset_id)
+            if row is None:
+                return None
+            dataset, _, rows = row
+
+            conditions = ["dataset = ?"]
+            params: List[Any] = [dataset]
+            # Without statistics SQLite would rather walk the primary key in seq
+            # order than use an index and sort, so the index of the most
+            # selective filter is named explicitly.
+            index = ""
+            if level is not None:
+                conditions.append("level = ?")
+                params.append(LEVELS.index(level))
+                index = "INDEXED BY entries_level"
+            if start is not None:
+                conditions.append("epoch >= ?")
+                params.append(start)
+                index = "INDEXED BY entries_time"
+            if end is not None:
+                conditions.append("epoch < ?")
+                params.append(end)
+                index = "INDEXED BY entries_time"
+            if source is not None:
+                conditions.append("source = ?")
+                params.append(source)
+                index = "INDEXED BY entries_source"
+            if template is not None:
+                patterns = self._templates(dataset, rows).get(template, [])
+                conditions.append(f"pattern IN ({', '.join('?' * len(patterns))})")
+                params.extend(patterns)
+                if patterns:
+                    index = "INDEXED BY entries_pattern"
+            if contains:
+                conditions.append("instr(message, ?) > 0")
+                params.append(contains)
+            where = " AND ".join(conditions)
+
+            total = self.db.execute(f"SELECT COUNT(*) FROM entries {index} WHERE {where}", params).fetchone()[0]
+            found = self.db.execute(
+                f"SELECT seq, timestamp, level, message, source, malformed FROM entries {index} "
+                f"WHERE {where} AND seq > ? ORDER BY seq LIMIT ? OFFSET ?",
+                params + [after, limit, offset],
+            ).fetchall()
+
+        return {
+            "datasetId": dataset_id,
+            "total": total,
+            "entries": [
+                {"seq": seq, "timestamp": timestamp, "level": LEVELS[code], "message": message,
+                 "source": source, "malformed": bool(malformed)}
+                for seq, timestamp, code, message, source, malformed in found
+            ],
+            "next": found[-1][0] if found and len(found) == limit else None,
+        }
+
+    def _dataset(self, dataset_id: str) -> Optional[Tuple[int, float, int]]:
+        return self.db.execute("SELECT id, created, rows FROM datasets WHERE name = ?", (dataset_id,)).fetchone()
+
+    def _templates(self, dataset: int, rows: int) -> Dict[str, List[str]]:
+        """Patterns of each error template, mined as for ``topErrors``: distinct
+        patterns with their counts in first-seen order. Cached until the
+        dataset grows."""
+        cached = self.templates.get(dataset)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        found = self.db.execute(
+            "SELECT pattern, COUNT(*) FROM entries WHERE dataset = ? AND pattern IS NOT NULL "
+            "GROUP BY pattern ORDER BY MIN(seq)", (dataset,),
+        ).fetchall()
+        miner = TemplateMiner()
+        assigned = [(pattern, miner.add(pattern, count)) for pattern, count in found]
+        by_template: Dict[str, List[str]] = {}
+        for pattern, mined in assigned:
+            by_template.setdefault(mined.text, []).append(pattern)
+        self.templates[dataset] = (rows, by_template)
+        return by_template
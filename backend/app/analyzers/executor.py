@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE, ANALYSIS_TIMEOUT, NLP_SAMPLE_CHARS
+from app.analyzers.log_analyzer import analyze_logs_structure, MISSING_TIMESTAMPS_SKIP
+from app.analyzers.nlp_analyzer import perform_nlp_analysis
+from app.analyzers.nlp_pipeline import use_in_process_nlp
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE
+from app.parsers.log_parser import ParseProfile
+from app.utils.admission import AdmissionController
+from app.utils.profiling import call_profiled, current_profile
+from app.utils.timing import StageTimer
+
+class AnalysisTimeout(Exception):
+    pass
+
+class AnalysisUnavailable(Exception):
+    pass
+
+admission = AdmissionController(ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def init_worker() -> None:
+    # Requests already run in parallel across these workers, so spaCy does
+    # not start a second level of processes inside each of them.
+    use_in_process_nlp()
+
+def get_analysis_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, initializer=init_worker)
+        return _pool
+
+def shutdown_analysis_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def nlp_analysis_job(text: str, sample_chars: int = NLP_SAMPLE_CHARS) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    timer = StageTimer()
+    with timer.stage("split"):
+        lines = [line.strip() for line in text.split("\n") if line.strip()]
+    return perform_nlp_analysis(text, lines, timer, sample_chars), timer.stages
+
+def log_analysis_job(log_data: str, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                     json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0,
+                     time_resolution: int = 0,
+                     dataset_id: Optional[str] = None) -> Tuple[Dict[str, Any], ParseProfile]:
+    profile = ParseProfile()
+    result = analyze_logs_structure(log_data, sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                    time_resolution, dataset_id, profile)
+    return result, profile
+
+@contextmanager
+def admitted() -> Iterator[None]:
+    """Hold an admission slot for work done in the calling thread."""
+    admission.acquire()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        admission.release(time.perf_counter() - started)
+
+async def run_analysis(func: Callable, *args: Any, in_process: bool = True,
+                       timeout: float = ANALYSIS_TIMEOUT) -> Any:
+    """Run ``func(*args)`` in the analysis pool without blocking the event loop.
+
+    Raises ``Overloaded`` when the admission queue is full, ``AnalysisTimeout``
+    after ``timeout`` seconds and ``AnalysisUnavailable`` if a worker died.
+    A timed-out analysis that already started keeps its slot until it ends,
+    so the queue never admits more work than the workers can absorb. When
+    the request is being profiled, ``func`` runs under cProfile wherever it
+    runs and its stats are added to the request's profile.
+    """
+    profile = current_profile.get()
+    if profile is not None:
+        func, args = call_profiled, (func,) + args
+    admission.acquire()
+    started = time.perf_counter()
+    pool = None
+    try:
+        if in_process and ANALYSIS_WORKERS > 0:
+            pool = get_analysis_pool()
+            future = pool.submit(func, *args)
+        else:
+            future = Future()
+            future.set_running_or_notify_cancel()
+            asyncio.ensure_future(_run_in_thread(future, func, args))
+    except BaseException:
+        admission.release(time.perf_counter() - started)
+        raise
+    future.add_done_callback(lambda _: admission.release(time.perf_counter() - started))
+
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise AnalysisTimeout()
+    except BrokenProcessPool:
+        if pool is not None:
+            _discard_broken_pool(pool)
+        raise AnalysisUnavailable()
+    if profile is not None:
+        result, stats = result
+        profile.add(stats)
+    return result
+
+async def _run_in_thread(future: Future, func: Callable, args: List[Any]) -> None:
+    try:
+        future.set_result(await run_in_threadpool(func, *args))
+    except BaseException as e:
+        future.set_exception(e)
@@ -0,0 +1,299 @@
+import codecs
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+from app.config import ANALYSIS_WORKERS, JOB_WORKERS, JOB_MAX_JOBS, JOB_RESULT_TTL_SECONDS, NLP_SAMPLE_CHARS
+from app.analyzers.log_analyzer import LogStructureAccumulator
+from app.analyzers.parallel import analyze_chunks_parallel
+from app.analyzers.executor import get_analysis_pool, nlp_analysis_job
+from app.parsers.log_parser import ParseProfile
+from app.utils.admission import Overloaded
+from app.utils.metrics import observe_log_analysis, observe_nlp_analysis
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+FILE_CHUNK_SIZE = 1024 * 1024
+
+class Job:
+    def __init__(self, kind: str, run: Callable[["Job"], Optional[Dict[str, Any]]], total_chars: int,
+                 cleanup: Optional[Callable[[], None]] = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.cleanup = cleanup
+        self.status = JOB_QUEUED
+        self.total_chars = total_chars
+        self.chars_processed = 0
+        self.lines_processed = 0
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancelled = threading.Event()
+
+    def report(self, lines: int, chars: int) -> None:
+        self.lines_processed = lines
+        self.chars_processed = chars
+
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def eta(self) -> Optional[float]:
+        """Seconds left, extrapolated from the throughput so far."""
+        if self.status != JOB_RUNNING or not self.chars_processed:
+            return None
+        return self.elapsed() * (self.total_chars - self.chars_processed) / self.chars_processed
+
+    def info(self) -> Dict[str, Any]:
+        elapsed = self.elapsed()
+        eta = self.eta()
+        return {
+            "jobId": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "progress": {
+                "linesProcessed": self.lines_processed,
+                "charsProcessed": self.chars_processed,
+                "totalChars": self.total_chars,
+                "percent": round(100 * self.chars_processed / self.total_chars, 1) if self.total_chars else None,
+                "elapsedSeconds": round(elapsed, 3),
+                "linesPerSecond": round(self.lines_processed / elapsed) if elapsed else None,
+                "etaSeconds": round(eta, 1) if eta is not None else None,
+            },
+            "error": self.error,
+        }
+
+class JobManager:
+    """In-process job queue served by ``workers`` background threads.
+
+    The threads only coordinate: log jobs fan out to the parse pool shard by
+    shard (which is what makes progress and cancellation possible), NLP jobs
+    run as one task in the analysis pool. Jobs and their results live in
+    memory; finished jobs are dropped after ``ttl_seconds`` or when room is
+    needed for new submissions.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_jobs: int = JOB_MAX_JOBS,
+                 ttl_seconds: float = JOB_RESULT_TTL_SECONDS,
+                 on_done: Optional[Callable[[Job], None]] = None):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.on_done = on_done
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self.threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"analysis-job-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        with self.lock:
+            for job in self.jobs.values():
+                job.cancelled.set()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+
+    def submit(self, job: Job) -> Job:
+        with self.lock:
+            self._expire()
+            if len(self.jobs) >= self.max_jobs and not self._drop_oldest_finished():
+                if job.cleanup:
+                    job.cleanup()
+                raise Overloaded(self._retry_after())
+            self.jobs[job.job_id] = job
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            self._expire()
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            self._expire()
+            return [job.info() for job in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; a finished job is forgotten."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in FINISHED_STATES:
+                del self.jobs[job_id]
+            else:
+                job.cancelled.set()
+            return job
+
+    def _work(self) -> None:
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                if job.cleanup:
+                    job.cleanup()
+
+    def _run(self, job: Job) -> None:
+        if job.cancelled.is_set():
+            self._finish(job, JOB_CANCELLED)
+            return
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = job.run(job)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            self._finish(job, JOB_FAILED)
+            return
+        self._finish(job, JOB_CANCELLED if job.result is None else JOB_DONE)
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.finished_at = time.time()
+        job.status = status
+        if status == JOB_DONE and self.on_done:
+            self.on_done(job)
+
+    def _drop_oldest_finished(self) -> bool:
+        for job_id, job in self.jobs.items():
+            if job.status in FINISHED_STATES:
+                del self.jobs[job_id]
+                return True
+        return False
+
+    def _expire(self) -> None:
+        deadline = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at < deadline
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _retry_after(self) -> int:
+        # A slot frees up when the first running job finishes.
+        etas = [job.eta() for job in self.jobs.values()]
+        etas = [eta for eta in etas if eta is not None]
+        return max(1, math.ceil(min(etas))) if etas else 5
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"jobs": len(self.jobs), "maxJobs": self.max_jobs, "workers": self.workers, "byStatus": counts}
+
+def log_job_runner(chunks: Callable[[], Iterator[str]], sniff_lines: int, missing_timestamps: str,
+                   json_profile: str, sketch_error: float, time_resolution: int = 0,
+                   create_dataset: Optional[Callable[[], str]] = None) -> Callable[[Job], Optional[Dict[str, Any]]]:
+    """Runner storing the entries in a dataset from ``create_dataset`` when given.
+
+    The dataset is created when the job starts, so a job rejected by a full
+    queue or cancelled while queued leaves none behind.
+    """
+    def run(job: Job) -> Optional[Dict[str, Any]]:
+        def progress(accumulator: LogStructureAccumulator, chars: int) -> None:
+            job.report(accumulator.total_lines, chars)
+
+        dataset_id = create_dataset() if create_dataset is not None else None
+        profile = ParseProfile()
+        started = time.perf_counter()
+        result = analyze_chunks_parallel(chunks(), sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                         time_resolution, dataset_id, profile, on_progress=progress,
+                                         cancelled=job.cancelled)
+        if result is not None:
+            observe_log_analysis("job", profile, time.perf_counter() - started)
+            if dataset_id is not None:
+                result["datasetId"] = dataset_id
+        return result
+    return run
+
+def text_chunks(text: str, size: int = FILE_CHUNK_SIZE) -> Callable[[], Iterator[str]]:
+    return lambda: (text[i:i + size] for i in range(0, len(text), size))
+
+def file_chunks(path: str, size: int = FILE_CHUNK_SIZE) -> Callable[[], Iterator[str]]:
+    def read() -> Iterator[str]:
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                yield chunk
+    return read
+
+def copy_text_file(source: BinaryIO, path: str, size: int = FILE_CHUNK_SIZE) -> int:
+    """Copy ``source`` to ``path`` and return its length in characters as
+    ``file_chunks`` will read it, the unit jobs report progress in."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chars = 0
+    with open(path, "wb") as copy:
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                break
+            copy.write(chunk)
+            chars += len(decoder.decode(chunk))
+    return chars + len(decoder.decode(b"", final=True))
+
+def remove_file(path: str) -> Callable[[], None]:
+    def remove() -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return remove
+
+def nlp_job_runner(text: str, sample_chars: int = NLP_SAMPLE_CHARS) -> Callable[[Job], Optional[Dict[str, Any]]]:
+    def run(job: Job) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        if ANALYSIS_WORKERS <= 0:
+            result, stages = nlp_analysis_job(text, sample_chars)
+            observe_nlp_analysis("analyze-job", text, stages, time.perf_counter() - started)
+            job.report(sum(1 for line in text.split("\n") if line.strip()), len(text))
+            return result
+
+        # A job that already started in the pool runs to the end even when
+        # cancelled; its result is just discarded.
+        future = get_analysis_pool().submit(nlp_analysis_job, text, sample_chars)
+        while True:
+            if job.cancelled.is_set():
+                future.cancel()
+                return None
+            try:
+                result, stages = future.result(timeout=0.5)
+                break
+            except FutureTimeoutError:
+                continue
+        observe_nlp_analysis("analyze-job", text, stages, time.perf_counter() - started)
+        job.report(sum(1 for line in text.split("\n") if line.strip()), len(text))
+        return result
+    return run
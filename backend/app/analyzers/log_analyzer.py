@@ -1,101 +1,60 @@
+import copy
 import re
-from typing import List, Dict, Any
-from datetime import datetime
+from functools import partial
+from typing import Iterable, List, Dict, Any, Optional, Union
 from collections import Counter
 
-from app.models.schemas import LogEntry
-from app.parsers.log_parser import parse_log_line
-
-def analyze_logs_structure(log_data: str) -> Dict[str, Any]:
-    lines = log_data.strip().split("\n")
-    entries = []
-
-    for line in lines:
-        entry = parse_log_line(line)
-        if entry:
-            entries.append(entry)
-
-    stats = {
-        "total": len(entries),
-        "errors": sum(1 for e in entries if e.level == "ERROR"),
-        "warnings": sum(1 for e in entries if e.level == "WARNING"),
-        "info": sum(1 for e in entries if e.level == "INFO"),
-        "debug": sum(1 for e in entries if e.level == "DEBUG"),
-        "malformed": sum(1 for e in entries if "MALFORMED LOG" in e.message),
-        "corrupted_lines": len(lines) - len(entries)
-    }
+from app.models.entry import ERROR, WARNING, INFO, DEBUG
+from app.parsers.log_parser import parse_log_line, FormatSniffer, ParseProfile
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE, get_json_fields
+from app.analyzers.templates import group_by_template, mask_variables
+from app.analyzers.entry_store import EntryBuffer, EntryWriter, entry_rows, entry_writer
+from app.analyzers.time_series import RateHistogram, build_time_series
+from app.utils.log_utils import IP_PATTERN, LineSplitter
+from app.utils.sketches import HeavyHitters
 
-    top_errors = analyze_top_errors(entries)
-    time_analysis = analyze_time_patterns(entries)
-    patterns = analyze_patterns(entries, log_data)
-    integrity_check = analyze_integrity(lines, entries)
-
-    result = {
-        "stats": stats,
-        "entries": entries[:100],
-        "topErrors": top_errors,
-        "timeAnalysis": time_analysis,
-        "patterns": patterns,
-        "integrity": integrity_check
-    }
-    
-    return result
+KEYWORD_PATTERN = re.compile(r"\b\w{4,}\b")
+MAX_RETURNED_ENTRIES = 100
+BLOCK_SIZE = 4096
 
-def analyze_top_errors(entries: List[LogEntry]) -> List[Dict[str, Any]]:
-    error_messages = [e.message for e in entries if e.level == "ERROR"]
-    error_counts = {}
-    
-    for msg in error_messages:
-        key = msg[:100]
-        error_counts[key] = error_counts.get(key, 0) + 1
-    
-    top_errors = sorted(error_counts.items(), key=lambda x: -x[1])[:5]
-    return [{"message": msg, "count": count} for msg, count in top_errors]
+# What the time analysis does with lines that carry no usable timestamp:
+# leave them out, or count them at the timestamp of the closest earlier line.
+MISSING_TIMESTAMPS_SKIP = "skip"
+MISSING_TIMESTAMPS_INHERIT = "inherit"
 
-def analyze_time_patterns(entries: List[LogEntry]) -> Dict[str, int]:
-    time_analysis = {}
-    
-    for entry in entries:
-        try:
-            hour = datetime.fromisoformat(entry.timestamp).hour
-            time_analysis[hour] = time_analysis.get(hour, 0) + 1
-        except:
-            continue
-            
-    return time_analysis
-
-def analyze_patterns(entries: List[LogEntry], log_data: str) -> Dict[str, Any]:
-    ips = re.findall(r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b", log_data)
-    ip_counts = Counter(ips)
-    suspicious_ips = [ip for ip, count in sorted(ip_counts.items(), key=lambda x: -x[1])[:10]]
-
-    frequent_keywords = extract_frequent_keywords(entries)
+# The per-key counts behind topErrors, suspiciousIPs and frequentKeywords.
+COUNTER_SECTIONS = {"error_counts": "topErrors", "ip_counts": "suspiciousIPs", "word_counts": "frequentKeywords"}
 
-    return {
-        "suspiciousIPs": suspicious_ips,
-        "frequentKeywords": frequent_keywords,
-    }
+def analyze_logs_structure(log_data: str, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                           json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0,
+                           time_resolution: int = 0, dataset_id: Optional[str] = None,
+                           profile: Optional[ParseProfile] = None) -> Dict[str, Any]:
+    with entry_writer(dataset_id) as writer:
+        accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                              time_resolution, writer)
+        accumulator.add_lines(log_data.strip().split("\n"))
+    if profile is not None:
+        profile.merge(accumulator.profile)
+    return accumulator.result()
 
-def extract_frequent_keywords(entries: List[LogEntry]) -> List[Dict[str, Any]]:
-    all_words = []
-    
-    for entry in entries:
-        words = re.findall(r"\b\w{4,}\b", entry.message.lower())
-        all_words.extend(word for word in words if not word.isdigit())
-    
-    word_counts = Counter(all_words)
+def summarize_top_errors(error_counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    top_errors = group_by_template(error_counts)[:5]
+    return [{"message": template, "count": count} for template, count in top_errors]
+
+def summarize_ips(ip_counts: Counter) -> List[str]:
+    return [ip for ip, count in sorted(ip_counts.items(), key=lambda x: -x[1])[:10]]
+
+def summarize_keywords(word_counts: Counter) -> List[Dict[str, Any]]:
     frequent_keywords = word_counts.most_common(10)
-    
     return [{"word": word, "count": count} for word, count in frequent_keywords]
 
-def analyze_integrity(lines: List[str], entries: List[LogEntry]) -> Dict[str, Any]:
-    malformed_entries = sum(1 for e in entries if "MALFORMED LOG" in e.message)
-    unparsable_lines = len(lines) - len(entries)
+def build_integrity(total_lines: int, parsed_entries: int, malformed_entries: int) -> Dict[str, Any]:
+    unparsable_lines = total_lines - parsed_entries
     
     integrity_score = 100
-    if lines:
-        valid_entries = len(entries) - malformed_entries
-        integrity_score = round((valid_entries / len(lines)) * 100, 2)
+    if total_lines:
+        valid_entries = parsed_entries - malformed_entries
+        integrity_score = round((valid_entries / total_lines) * 100, 2)
     
     issues = []
     
@@ -107,10 +66,282 @@ def analyze_integrity(lines: List[str], entries: List[LogEntry]) -> Dict[str, An
         issues.append("Низька цілісність даних - рекомендується перевірка лог-файлу")
 
     return {
-        "total_lines": len(lines),
-        "parsed_entries": len(entries),
+        "total_lines": total_lines,
+        "parsed_entries": parsed_entries,
         "malformed_entries": malformed_entries,
         "unparsable_lines": unparsable_lines,
         "integrity_score": integrity_score,
         "issues": issues
     }
+
+class LogStructureAccumulator:
+    """Single-pass aggregator behind every ``/analyze-log`` variant.
+
+    Each line is parsed once and folded into running counters for all sections
+    of ``LogAnalysisResult``, so memory depends on the number of distinct
+    errors, hours, IPs and words rather than on the size of the input. Lines
+    can be pushed whole (``add_lines``) or as raw chunks (``feed``/``close``).
+    A non-zero ``sniff_lines`` enables ``FormatSniffer``. ``missing_timestamps``
+    is one of the ``MISSING_TIMESTAMPS_*`` modes; inherited timestamps are
+    also filled into the returned entries. ``json_profile`` names the field
+    mapping used for JSON lines.
+
+    With a non-zero ``sketch_error`` errors, IPs and keywords are counted in
+    ``HeavyHitters`` summaries instead of exact counters, so memory stays
+    bounded on high-cardinality input; counts may then be low by up to
+    ``sketch_error`` times the number counted, as reported under ``accuracy``
+    (per masked error message; a top error template may combine several).
+
+    A non-zero ``time_resolution`` adds ``timeSeries``: entry counts per
+    bucket of that many seconds, by level, with spikes and drops. The
+    timestamps are kept as per-second counts in a ``RateHistogram``.
+
+    Every parsed entry is also written to ``entry_sink`` when one is given:
+    an ``EntryWriter`` stores them for ``/entries`` queries, an
+    ``EntryBuffer`` keeps them for the accumulator this one is merged into.
+
+    ``profile`` counts entries per format and samples parse times for the
+    service metrics; it is not part of the result.
+    """
+
+    def __init__(self, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                 json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0, time_resolution: int = 0,
+                 entry_sink: Union[EntryWriter, EntryBuffer, None] = None):
+        if missing_timestamps not in (MISSING_TIMESTAMPS_SKIP, MISSING_TIMESTAMPS_INHERIT):
+            raise ValueError(f"Unknown missing_timestamps mode: {missing_timestamps}")
+        json_fields = get_json_fields(json_profile)
+        self.missing_timestamps = missing_timestamps
+        self.json_profile = json_profile
+        self.sketch_error = sketch_error
+        self.time_resolution = time_resolution
+        self.entry_sink = entry_sink
+        self.inherit = missing_timestamps == MISSING_TIMESTAMPS_INHERIT
+        self.splitter = LineSplitter()
+        self.sniffer = FormatSniffer(sniff_lines, json_fields=json_fields) if sniff_lines else None
+        if self.sniffer:
+            self.parse = self.sniffer.parse
+        elif json_profile == DEFAULT_JSON_PROFILE:
+            self.parse = parse_log_line
+        else:
+            self.parse = partial(parse_log_line, json_fields=json_fields)
+        self.profile = ParseProfile()
+        self.total_lines = 0
+        self.parsed_entries = 0
+        self.level_counts = [0, 0, 0, 0]
+        self.malformed_entries = 0
+        self.untimed_entries = 0
+        # Last timestamp seen, and (inherit mode) the count of untimed entries
+        # before the first one, which an accumulator for earlier lines resolves
+        # on merge.
+        self.last_moment = None
+        self.leading_untimed = 0
+        self.leading_levels = [0, 0, 0, 0]
+        self.entries = []
+        self.time_analysis: Dict[int, int] = {}
+        self.rates = RateHistogram() if time_resolution else None
+        self.error_counts = self._new_counts()
+        self.ip_counts = self._new_counts()
+        self.word_counts = self._new_counts()
+
+    def _new_counts(self) -> Union[Counter, HeavyHitters]:
+        return HeavyHitters.for_error(self.sketch_error) if self.sketch_error else Counter()
+
+    def feed(self, chunk: str) -> None:
+        self.add_lines(self.splitter.feed(chunk))
+
+    def close(self) -> None:
+        self.add_lines(self.splitter.close())
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) >= BLOCK_SIZE:
+                self._add_block(block)
+                block = []
+        if block:
+            self._add_block(block)
+
+    def _add_block(self, lines: List[str]) -> None:
+        # IPs and keywords are extracted once per block from the joined text,
+        # which matches per-line extraction since neither pattern spans "\n".
+        self.ip_counts.update(IP_PATTERN.findall("\n".join(lines)))
+
+        level_counts = self.level_counts
+        entries = self.entries
+        time_analysis = self.time_analysis
+        inherit = self.inherit
+        last_moment = self.last_moment
+        messages = []
+        errors = []
+        stored = [] if self.entry_sink is not None else None
+        rates = self.rates
+        moments = []
+        moment_levels = []
+        formats = []
+        malformed_formats = []
+        parsed_entries = malformed_entries = untimed_entries = 0
+
+        for entry in self.profile.parse_block(self.parse, lines):
+            if not entry:
+                continue
+
+            parsed_entries += 1
+            level_counts[entry.level_code] += 1
+            formats.append(entry.log_format)
+            if entry.malformed:
+                malformed_entries += 1
+                malformed_formats.append(entry.log_format)
+            if len(entries) < MAX_RETURNED_ENTRIES:
+                entries.append(entry)
+            if stored is not None:
+                stored.append(entry)
+
+            message = entry.message
+            messages.append(message)
+            if entry.level_code == ERROR:
+                errors.append(message[:100])
+
+            hour = entry.hour
+            if hour is None:
+                untimed_entries += 1
+                if inherit:
+                    if last_moment is None:
+                        self.leading_untimed += 1
+                        self.leading_levels[entry.level_code] += 1
+                    else:
+                        entry.inherit_timestamp(last_moment)
+                        hour = entry.hour
+            else:
+                last_moment = entry.moment
+            if hour is not None:
+                time_analysis[hour] = time_analysis.get(hour, 0) + 1
+                if rates is not None:
+                    moments.append(entry.moment)
+                    moment_levels.append(entry.level_code)
+
+        self.profile.count(formats, malformed_formats)
+        patterns = mask_variables(errors)
+        self.error_counts.update(patterns)
+        if stored is not None:
+            self.entry_sink.write(entry_rows(stored, patterns))
+        if rates is not None:
+            rates.add(moments, moment_levels)
+        words = KEYWORD_PATTERN.findall("\n".join(messages).lower())
+        self.word_counts.update([word for word in words if not word.isdigit()])
+
+        self.total_lines += len(lines)
+        self.parsed_entries += parsed_entries
+        self.malformed_entries += malformed_entries
+        self.untimed_entries += untimed_entries
+        self.last_moment = last_moment
+
+    def merge(self, other: "LogStructureAccumulator") -> None:
+        """Fold in an accumulator that saw the lines following this one's."""
+        self.total_lines += other.total_lines
+        self.parsed_entries += other.parsed_entries
+        self.malformed_entries += other.malformed_entries
+        self.untimed_entries += other.untimed_entries
+        self.profile.merge(other.profile)
+        for code, count in enumerate(other.level_counts):
+            self.level_counts[code] += count
+        taken = other.entries[:MAX_RETURNED_ENTRIES - len(self.entries)]
+        store_rows = self.entry_sink is not None and other.entry_sink is not None
+        if self.inherit and other.leading_untimed:
+            if self.last_moment is None:
+                self.leading_untimed += other.leading_untimed
+                for code, count in enumerate(other.leading_levels):
+                    self.leading_levels[code] += count
+            else:
+                hour = self.last_moment.hour
+                self.time_analysis[hour] = self.time_analysis.get(hour, 0) + other.leading_untimed
+                if self.rates is not None:
+                    self.rates.add_counts(self.last_moment, other.leading_levels)
+                for entry in taken:
+                    if entry.moment is not None:
+                        break
+                    entry.inherit_timestamp(self.last_moment)
+                if store_rows:
+                    other.entry_sink.inherit_leading(other.leading_untimed, self.last_moment)
+        if store_rows:
+            self.entry_sink.write(other.entry_sink.rows)
+        if other.last_moment is not None:
+            self.last_moment = other.last_moment
+        self.entries.extend(taken)
+        for hour, count in other.time_analysis.items():
+            self.time_analysis[hour] = self.time_analysis.get(hour, 0) + count
+        if self.rates is not None:
+            self.rates.merge(other.rates)
+        for name in COUNTER_SECTIONS:
+            counts = getattr(self, name)
+            if self.sketch_error:
+                counts.merge(getattr(other, name))
+            else:
+                counts.update(getattr(other, name))
+        if self.sniffer and other.sniffer:
+            self.sniffer.merge(other.sniffer)
+
+    def prune(self, max_keys: int) -> int:
+        """Keep the ``max_keys // 2`` most frequent keys of any counter that grew
+        past ``max_keys``; returns how many keys were dropped. Sketches are
+        bounded already and left alone."""
+        dropped = 0
+        if self.sketch_error:
+            return dropped
+        for name in COUNTER_SECTIONS:
+            counts = getattr(self, name)
+            if len(counts) <= max_keys:
+                continue
+            kept = {key for key, _ in counts.most_common(max_keys // 2)}
+            # Rebuild in first-seen order, which breaks ties in the summaries.
+            pruned = Counter({key: count for key, count in counts.items() if key in kept})
+            dropped += len(counts) - len(pruned)
+            setattr(self, name, pruned)
+        return dropped
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Result as if the input ended now, without closing the accumulator."""
+        view = LogStructureAccumulator(missing_timestamps=self.missing_timestamps, json_profile=self.json_profile,
+                                       sketch_error=self.sketch_error, time_resolution=self.time_resolution)
+        view.merge(self)
+        if self.sniffer:
+            view.sniffer = copy.deepcopy(self.sniffer)
+            view.parse = view.sniffer.parse
+        view.add_lines(self.splitter.peek())
+        return view.result()
+
+    def result(self) -> Dict[str, Any]:
+        stats = {
+            "total": self.parsed_entries,
+            "errors": self.level_counts[ERROR],
+            "warnings": self.level_counts[WARNING],
+            "info": self.level_counts[INFO],
+            "debug": self.level_counts[DEBUG],
+            "malformed": self.malformed_entries,
+            "no_timestamp": self.untimed_entries,
+            "corrupted_lines": self.total_lines - self.parsed_entries
+        }
+
+        result = {
+            "stats": stats,
+            "entries": [e.to_model() for e in self.entries],
+            "topErrors": summarize_top_errors(self.error_counts),
+            "timeAnalysis": dict(self.time_analysis),
+            "patterns": {
+                "suspiciousIPs": summarize_ips(self.ip_counts),
+                "frequentKeywords": summarize_keywords(self.word_counts),
+            },
+            "integrity": build_integrity(self.total_lines, self.parsed_entries, self.malformed_entries)
+        }
+        if self.sniffer:
+            result["detection"] = self.sniffer.stats()
+        if self.rates is not None:
+            result["timeSeries"] = build_time_series(self.rates, self.time_resolution)
+        if self.sketch_error:
+            result["accuracy"] = {
+                "mode": "approximate",
+                "errorBound": self.sketch_error,
+                **{section: getattr(self, name).accuracy() for name, section in COUNTER_SECTIONS.items()},
+            }
+
+        return result
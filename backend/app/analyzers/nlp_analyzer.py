@@ -1,25 +1,169 @@
 import re
-import spacy
 from typing import List, Dict, Any, Optional
 from collections import Counter
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-    nlp.max_length = 5_000_000
-except OSError:
-    print("Warning: spaCy English model not found. Install with: python -m spacy download en_core_web_sm")
-    nlp = None
+from app.analyzers.nlp_pipeline import NlpFeatures, get_model, run_nlp
+from app.analyzers.sampling import CONFIDENCE_LEVEL, LineSample, margin_of_error, stratified_sample
+from app.analyzers.templates import group_by_template, mask_variables
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.timing import StageTimer
+from app.utils.log_utils import IP_PATTERN
+from app.config import NLP_SAMPLE_CHARS, NLP_SAMPLE_BUCKETS
 
-def analyze_sentiment(lines: List[str]) -> Dict[str, Any]:
-    positive_words = ["success", "completed", "ok", "good", "passed", "connected", "started"]
-    negative_words = ["error", "failed", "exception", "timeout", "denied", "rejected", "critical"]
+POSITIVE_WORDS = ["success", "completed", "ok", "good", "passed", "connected", "started"]
+NEGATIVE_WORDS = ["error", "failed", "exception", "timeout", "denied", "rejected", "critical"]
+MESSAGE_CATEGORIES = {
+    "authentication": ["login", "auth", "password", "token", "session", "user", "credential"],
+    "database": ["sql", "query", "database", "connection", "table", "mysql", "postgres", "mongodb"],
+    "network": ["http", "tcp", "connection", "request", "response", "socket", "port", "ssl"],
+    "security": ["security", "access", "denied", "unauthorized", "blocked", "firewall", "attack"],
+    "performance": ["slow", "timeout", "memory", "cpu", "performance", "load", "latency"],
+    "error": ["error", "exception", "failed", "critical", "fatal", "panic"],
+    "system": ["system", "kernel", "process", "service", "daemon", "startup", "shutdown"]
+}
+ERROR_KEYWORDS = ["error", "exception", "failed", "critical", "fatal"]
+
+# Bit flags produced by one keyword scan of a lowercased line.
+NEGATIVE = 1 << 0
+POSITIVE = 1 << 1
+ERROR_KEYWORD = 1 << 2
+ERROR_WORD = 1 << 3
+WARN_WORD = 1 << 4
+CATEGORY_FLAGS = {category: 1 << (5 + i) for i, category in enumerate(MESSAGE_CATEGORIES)}
+
+def build_keyword_flags() -> Dict[str, int]:
+    flags: Dict[str, int] = {}
+
+    def add(words: List[str], flag: int) -> None:
+        for word in words:
+            flags[word] = flags.get(word, 0) | flag
+
+    add(NEGATIVE_WORDS, NEGATIVE)
+    add(POSITIVE_WORDS, POSITIVE)
+    add(ERROR_KEYWORDS, ERROR_KEYWORD)
+    add(["error"], ERROR_WORD)
+    add(["warn"], WARN_WORD)
+    for category, words in MESSAGE_CATEGORIES.items():
+        add(words, CATEGORY_FLAGS[category])
+    return flags
+
+KEYWORD_MATCHER = KeywordMatcher(build_keyword_flags())
+
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
+URL_PATTERN = re.compile(r"https?:\/\/[^\s]+")
+FILE_PATTERN = re.compile(r"[^\s]+\.(log|txt|json|xml|csv|sql|py|js|html|css)")
+FILE_HINT_PATTERN = re.compile(r"\.(?:log|txt|json|xml|csv|sql|py|js|html|css)")
+# r"\b(\d{1,2}):(\d{2}):(\d{2})\b" with the leading \b moved behind the first
+# hour digit as (?<!\w\d), the same rewrite as IP_PATTERN in app.utils.log_utils.
+TIME_PATTERN = re.compile(r"(\d(?<!\w\d)\d?):(\d{2}):(\d{2})\b")
+TOKEN_PATTERN = re.compile(r"\b\w{3,}\b")
+STOP_WORDS = {"the", "and", "for", "are", "but", "not", "you", "all", "can", "had", "her", "was", "one", "our", "out", "day", "get", "has", "him", "his", "how", "its", "may", "new", "now", "old", "see", "two", "way", "who", "boy", "did", "use", "man", "she", "own", "say"}
+FEATURE_BLOCK_SIZE = 4096
+
+def scan_lines(lines: List[str]) -> List[int]:
+    return KEYWORD_MATCHER.scan_lines([line.lower() for line in lines])
+
+class LineFeatures:
+    """Everything the regex-based analyzers need, gathered in one pass.
+
+    Each line is lowercased once. The keyword scan and the IP, email, URL,
+    file, time and token patterns run once per block of joined lines, which
+    matches per-line matching because none of them can span a line break.
+    Email and file patterns only see the lines that can contain a match.
+    """
+
+    def __init__(self):
+        self.masks: List[int] = []
+        self.ips: Dict[str, None] = {}
+        self.emails: Dict[str, None] = {}
+        self.urls: Dict[str, None] = {}
+        self.files: Dict[str, None] = {}
+        self.ip_counts: Counter = Counter()
+        self.hour_counts: Counter = Counter()
+        self.time_count = 0
+        self.error_lowers: List[str] = []
+        self.tokens: Counter = Counter()
+
+def extract_line_features(lines: List[str], with_tokens: bool = True) -> LineFeatures:
+    features = LineFeatures()
+
+    for start in range(0, len(lines), FEATURE_BLOCK_SIZE):
+        block = lines[start:start + FEATURE_BLOCK_SIZE]
+        lowers = [line.lower() for line in block]
+        masks = KEYWORD_MATCHER.scan_lines(lowers)
+        features.masks.extend(masks)
+        features.error_lowers.extend(lower for lower, mask in zip(lowers, masks) if mask & ERROR_WORD)
+
+        joined = "\n".join(block)
+        ips = IP_PATTERN.findall(joined)
+        features.ip_counts.update(ips)
+        features.ips.update(dict.fromkeys(ips))
+        emails = EMAIL_PATTERN.findall("\n".join([line for line in block if "@" in line]))
+        features.emails.update(dict.fromkeys(emails))
+        features.urls.update(dict.fromkeys(URL_PATTERN.findall(joined)))
+        files = FILE_PATTERN.findall("\n".join([line for line in block if FILE_HINT_PATTERN.search(line)]))
+        features.files.update(dict.fromkeys(files))
+
+        times = TIME_PATTERN.findall(joined)
+        features.time_count += len(times)
+        features.hour_counts.update([int(h) for h, m, sec in times])
+
+        if with_tokens:
+            words = TOKEN_PATTERN.findall("\n".join(lowers))
+            features.tokens.update([word for word in words if word not in STOP_WORDS and not word.isdigit()])
+
+    return features
+
+def count_tokens(lines: List[str]) -> Counter:
+    """The ``tokens`` of ``extract_line_features``, on their own."""
+    tokens: Counter = Counter()
+    for start in range(0, len(lines), FEATURE_BLOCK_SIZE):
+        words = TOKEN_PATTERN.findall("\n".join(lines[start:start + FEATURE_BLOCK_SIZE]).lower())
+        tokens.update([word for word in words if word not in STOP_WORDS and not word.isdigit()])
+    return tokens
+
+def sample_for_nlp(lines: List[str], masks: List[int], budget_chars: int,
+                   buckets: int = NLP_SAMPLE_BUCKETS) -> LineSample:
+    """Lines for spaCy when the input is over budget, stratified by level
+    (error, warning, other, as in the summary) and by position in the input,
+    which follows time in a chronological log."""
+    total = len(lines)
+    buckets = max(1, buckets)
+    strata = []
+    for index, mask in enumerate(masks):
+        level = 0 if mask & ERROR_WORD else 1 if mask & WARN_WORD else 2
+        strata.append(level * buckets + index * buckets // total)
+    return stratified_sample(lines, strata, budget_chars)
+
+def sampling_summary(sample: LineSample, features: Optional[NlpFeatures], budget_chars: int) -> Dict[str, Any]:
+    """How much of the input spaCy saw. ``analyzedLines`` leaves out the
+    sampled lines the time budget skipped, estimated from skipped documents."""
+    analyzed = len(sample.lines)
+    if features is not None:
+        documents = features.documents + features.skipped_documents
+        if documents:
+            analyzed = round(analyzed * features.documents / documents)
+    return {
+        "mode": "stratified",
+        "budgetChars": budget_chars,
+        "totalLines": sample.total_lines,
+        "totalChars": sample.total_chars,
+        "sampledLines": len(sample.lines),
+        "sampledChars": sample.chars,
+        "analyzedLines": analyzed,
+        "strata": sample.strata,
+        "confidenceLevel": CONFIDENCE_LEVEL,
+        "marginOfError": round(margin_of_error(analyzed, sample.total_lines), 4),
+    }
+
+def analyze_sentiment(lines: List[str], line_features: Optional[LineFeatures] = None) -> Dict[str, Any]:
+    masks = line_features.masks if line_features else scan_lines(lines)
 
     pos = neg = neutral = 0
-    for line in lines:
-        lower = line.lower()
-        if any(w in lower for w in negative_words):
+    for mask in masks:
+        if mask & NEGATIVE:
             neg += 1
-        elif any(w in lower for w in positive_words):
+        elif mask & POSITIVE:
             pos += 1
         else:
             neutral += 1
@@ -33,27 +177,22 @@ def analyze_sentiment(lines: List[str]) -> Dict[str, Any]:
         "score": (pos - neg) / total if total else 0,
     }
 
-def extract_entities_improved(text: str, doc=None) -> Dict[str, List[str]]:
-    ip_regex = r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b"
-    email_regex = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
-    url_regex = r"https?:\/\/[^\s]+"
-    file_regex = r"[^\s]+\.(log|txt|json|xml|csv|sql|py|js|html|css)"
-    
-    ips = list(set(re.findall(ip_regex, text)))
-    emails = list(set(re.findall(email_regex, text)))
-    urls = list(set(re.findall(url_regex, text)))
-    files = list(set(re.findall(file_regex, text)))
+def extract_entities_improved(text: str, features: Optional[NlpFeatures] = None, line_features: Optional[LineFeatures] = None) -> Dict[str, List[str]]:
+    if line_features is None:
+        line_features = extract_line_features(text.split("\n"), with_tokens=False)
+
+    ips = list(line_features.ips)
+    emails = list(line_features.emails)
+    urls = list(line_features.urls)
+    files = list(line_features.files)
     
-    if doc and nlp:
-        try:
-            spacy_entities = {
-                "persons": [ent.text for ent in doc.ents if ent.label_ in ["PERSON"]],
-                "organizations": [ent.text for ent in doc.ents if ent.label_ in ["ORG"]],
-                "locations": [ent.text for ent in doc.ents if ent.label_ in ["GPE", "LOC"]],
-                "dates": [ent.text for ent in doc.ents if ent.label_ in ["DATE", "TIME"]],
-            }
-        except:
-            spacy_entities = {"persons": [], "organizations": [], "locations": [], "dates": []}
+    if features:
+        spacy_entities = {
+            "persons": [text for text, label in features.entities if label in ["PERSON"]],
+            "organizations": [text for text, label in features.entities if label in ["ORG"]],
+            "locations": [text for text, label in features.entities if label in ["GPE", "LOC"]],
+            "dates": [text for text, label in features.entities if label in ["DATE", "TIME"]],
+        }
     else:
         spacy_entities = {"persons": [], "organizations": [], "locations": [], "dates": []}
 
@@ -65,24 +204,19 @@ def extract_entities_improved(text: str, doc=None) -> Dict[str, List[str]]:
         **spacy_entities
     }
 
-def extract_keywords_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
-    if doc and nlp:
-        try:
-            tokens = [token.text.lower() for token in doc 
-                     if token.is_alpha and not token.is_stop 
-                     and len(token.text) >= 3 and not token.is_punct]
-        except:
-            tokens = re.findall(r'\b\w{3,}\b', " ".join(lines).lower())
+def extract_keywords_improved(features: Optional[NlpFeatures], lines: List[str], line_features: Optional[LineFeatures] = None) -> List[Dict[str, Any]]:
+    if features and features.tokens:
+        token_counts = Counter(features.tokens)
     else:
-        stop_words = {"the", "and", "for", "are", "but", "not", "you", "all", "can", "had", "her", "was", "one", "our", "out", "day", "get", "has", "him", "his", "how", "its", "may", "new", "now", "old", "see", "two", "way", "who", "boy", "did", "use", "man", "she", "own", "say"}
-        tokens = [word for word in re.findall(r'\b\w{3,}\b', " ".join(lines).lower()) 
-                 if word not in stop_words and not word.isdigit()]
+        if line_features is None:
+            line_features = extract_line_features(lines)
+        token_counts = line_features.tokens
 
-    total = len(tokens)
+    total = sum(token_counts.values())
     if total == 0:
         return []
         
-    counts = Counter(tokens).most_common(15)
+    counts = token_counts.most_common(15)
     max_weight = 0.1
     
     return [
@@ -94,50 +228,39 @@ def extract_keywords_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
         for word, count in counts
     ]
 
-def classify_messages_improved(doc, lines: List[str]) -> Dict[str, int]:
-    categories = {
-        "authentication": ["login", "auth", "password", "token", "session", "user", "credential"],
-        "database": ["sql", "query", "database", "connection", "table", "mysql", "postgres", "mongodb"],
-        "network": ["http", "tcp", "connection", "request", "response", "socket", "port", "ssl"],
-        "security": ["security", "access", "denied", "unauthorized", "blocked", "firewall", "attack"],
-        "performance": ["slow", "timeout", "memory", "cpu", "performance", "load", "latency"],
-        "error": ["error", "exception", "failed", "critical", "fatal", "panic"],
-        "system": ["system", "kernel", "process", "service", "daemon", "startup", "shutdown"]
-    }
+def classify_messages_improved(features: Optional[NlpFeatures], lines: List[str], line_features: Optional[LineFeatures] = None) -> Dict[str, int]:
+    masks = line_features.masks if line_features else scan_lines(lines)
 
-    result = {key: 0 for key in categories}
+    result = {key: 0 for key in MESSAGE_CATEGORIES}
     
-    for line in lines:
-        lower = line.lower()
-        for cat, keywords in categories.items():
-            if any(kw in lower for kw in keywords):
+    for mask in masks:
+        for cat, flag in CATEGORY_FLAGS.items():
+            if mask & flag:
                 result[cat] += 1
     
     return result
 
-def detect_anomalies_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
+def detect_anomalies_improved(features: Optional[NlpFeatures], lines: List[str], line_features: Optional[LineFeatures] = None) -> List[Dict[str, Any]]:
     anomalies = []
     total = len(lines)
     
     if total == 0:
         return anomalies
 
-    error_keywords = ["error", "exception", "failed", "critical", "fatal"]
-    error_lines = [l for l in lines if any(keyword in l.lower() for keyword in error_keywords)]
-    error_rate = len(error_lines) / total
+    if line_features is None:
+        line_features = extract_line_features(lines, with_tokens=False)
+
+    error_lines = sum(1 for mask in line_features.masks if mask & ERROR_KEYWORD)
+    error_rate = error_lines / total
     
     if error_rate > 0.1:
         anomalies.append({
             "type": "High Error Rate",
-            "description": f"Високий рівень помилок: {len(error_lines)} з {total} записів ({error_rate:.1%})",
+            "description": f"Високий рівень помилок: {error_lines} з {total} записів ({error_rate:.1%})",
             "severity": "high" if error_rate > 0.3 else "medium"
         })
 
-    ip_pattern = r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b"
-    ips = re.findall(ip_pattern, " ".join(lines))
-    ip_counts = Counter(ips)
-    
-    for ip, count in ip_counts.most_common(5):
+    for ip, count in line_features.ip_counts.most_common(5):
         if count > max(50, total * 0.1):
             anomalies.append({
                 "type": "Suspicious IP Activity",
@@ -145,15 +268,10 @@ def detect_anomalies_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
                 "severity": "medium" if count > total * 0.2 else "low"
             })
 
-    time_pattern = r"\b(\d{1,2}):(\d{2}):(\d{2})\b"
-    times = re.findall(time_pattern, " ".join(lines))
-    
-    if times:
-        hours = [int(h) for h, m, s in times]
-        hour_counts = Counter(hours)
-        avg_per_hour = len(times) / 24
+    if line_features.time_count:
+        avg_per_hour = line_features.time_count / 24
         
-        for hour, count in hour_counts.most_common(3):
+        for hour, count in line_features.hour_counts.most_common(3):
             if count > avg_per_hour * 3:
                 anomalies.append({
                     "type": "Time-based Anomaly",
@@ -161,14 +279,11 @@ def detect_anomalies_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
                     "severity": "low"
                 })
 
-    error_messages = [l for l in lines if "error" in l.lower()]
+    error_messages = line_features.error_lowers
     if error_messages:
-        error_patterns = {}
-        for msg in error_messages:
-            simplified = re.sub(r'\d+', 'N', msg.lower())[:50]
-            error_patterns[simplified] = error_patterns.get(simplified, 0) + 1
+        error_patterns = group_by_template(Counter(mask_variables(error_messages)))
         
-        for pattern, count in error_patterns.items():
+        for pattern, count in error_patterns:
             if count >= 5:
                 anomalies.append({
                     "type": "Repeated Error Pattern",
@@ -178,10 +293,12 @@ def detect_anomalies_improved(doc, lines: List[str]) -> List[Dict[str, Any]]:
 
     return anomalies
 
-def generate_summary(lines: List[str]) -> Dict[str, Any]:
+def generate_summary(lines: List[str], line_features: Optional[LineFeatures] = None) -> Dict[str, Any]:
+    masks = line_features.masks if line_features else scan_lines(lines)
+
     total = len(lines)
-    errors = sum(1 for l in lines if "error" in l.lower())
-    warnings = sum(1 for l in lines if "warn" in l.lower())
+    errors = sum(1 for mask in masks if mask & ERROR_WORD)
+    warnings = sum(1 for mask in masks if mask & WARN_WORD)
 
     health_score = max(0, 100 - (errors / total) * 100 - (warnings / total) * 50) if total else 100
     recommendations = [
@@ -198,30 +315,56 @@ def generate_summary(lines: List[str]) -> Dict[str, Any]:
         "recommendations": [r for r in recommendations if r],
     }
 
-def perform_nlp_analysis(text: str, lines: List[str]) -> Dict[str, Any]:
-    max_text_length = 1_000_000
-    if len(text) > max_text_length:
-        text_for_nlp = text[:max_text_length]
-        print(f"Текст обрізано до {max_text_length} символів для NLP аналізу")
-    else:
-        text_for_nlp = text
-    
-    doc = None
-    if nlp:
+def perform_nlp_analysis(text: str, lines: List[str], timer: Optional[StageTimer] = None,
+                         sample_chars: int = NLP_SAMPLE_CHARS) -> Dict[str, Any]:
+    """All /analyze results for ``lines``.
+
+    Over ``sample_chars`` characters (0 for no limit), spaCy only sees a
+    stratified sample of the lines, reported under ``sampling``; the regex
+    analyzers still read every line, and keyword counts are scaled up to
+    the whole input.
+    """
+    timer = timer or StageTimer()
+
+    sample = None
+    line_features = None
+    if sample_chars and sum(map(len, lines)) + len(lines) > sample_chars and get_model() is not None:
+        with timer.stage("features"):
+            line_features = extract_line_features(lines, with_tokens=False)
+        with timer.stage("sampling"):
+            sample = sample_for_nlp(lines, line_features.masks, sample_chars)
+
+    features = None
+    with timer.stage("spacy"):
         try:
-            doc = nlp(text_for_nlp)
+            features = run_nlp(sample.lines if sample else lines)
         except Exception as e:
             print(f"Помилка spaCy: {e}")
-            doc = None
 
-    sentiment_result = analyze_sentiment(lines)
-    entities_result = extract_entities_improved(text, doc)
-    keywords_result = extract_keywords_improved(doc, lines)
-    classification_result = classify_messages_improved(doc, lines)
-    anomalies_result = detect_anomalies_improved(doc, lines)
-    summary_result = generate_summary(lines)
+    if features and features.skipped_documents:
+        print(f"NLP аналіз обмежено бюджетом часу: пропущено {features.skipped_documents} з "
+              f"{features.documents + features.skipped_documents} фрагментів")
 
-    return {
+    with timer.stage("features"):
+        if line_features is None:
+            line_features = extract_line_features(lines, with_tokens=not (features and features.tokens))
+        elif not (features and features.tokens):
+            line_features.tokens = count_tokens(lines)
+
+    with timer.stage("sentiment"):
+        sentiment_result = analyze_sentiment(lines, line_features)
+    with timer.stage("entities"):
+        entities_result = extract_entities_improved(text, features, line_features)
+    with timer.stage("keywords"):
+        keywords_result = extract_keywords_improved(features, lines, line_features)
+    with timer.stage("classification"):
+        classification_result = classify_messages_improved(features, lines, line_features)
+    with timer.stage("anomalies"):
+        anomalies_result = detect_anomalies_improved(features, lines, line_features)
+    with timer.stage("summary"):
+        summary_result = generate_summary(lines, line_features)
+
+    result = {
         "sentiment": sentiment_result,
         "entities": entities_result,
         "keywords": keywords_result,
@@ -229,3 +372,11 @@ def perform_nlp_analysis(text: str, lines: List[str]) -> Dict[str, Any]:
         "anomalies": anomalies_result,
         "summary": summary_result,
     }
+    if sample is not None:
+        sampling = sampling_summary(sample, features, sample_chars)
+        if features and features.tokens and sampling["analyzedLines"]:
+            scale = sample.total_lines / sampling["analyzedLines"]
+            for keyword in keywords_result:
+                keyword["count"] = round(keyword["count"] * scale)
+        result["sampling"] = sampling
+    return result
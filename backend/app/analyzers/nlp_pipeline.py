@@ -0,0 +1,225 @@
+import gc
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from app.config import NLP_WORKERS, NLP_DOC_CHARS, NLP_BATCH_SIZE, NLP_TIME_BUDGET, NLP_PRELOAD
+
+MODEL_NAME = "en_core_web_sm"
+# Only doc.ents and lexical token attributes are read, so everything except
+# the NER component (and the tok2vec it may listen to) is switched off.
+UNUSED_PIPES = ["tagger", "parser", "senter", "attribute_ruler", "lemmatizer", "morphologizer"]
+ENTITY_LABELS = {"PERSON", "ORG", "GPE", "LOC", "DATE", "TIME"}
+
+MODEL_NOT_LOADED = "not_loaded"
+MODEL_LOADING = "loading"
+MODEL_READY = "ready"
+MODEL_UNAVAILABLE = "unavailable"
+
+# spaCy itself is imported on first use too: importing it costs about a
+# second, which workers that only serve /analyze-log should not pay.
+_nlp = None
+_model_state = MODEL_NOT_LOADED
+_model_load_seconds: Optional[float] = None
+_model_lock = threading.Lock()
+
+def load_model():
+    import spacy
+
+    try:
+        model = spacy.load(MODEL_NAME)
+    except OSError:
+        print("Warning: spaCy English model not found. Install with: python -m spacy download en_core_web_sm")
+        return None
+    for name in UNUSED_PIPES:
+        if name in model.pipe_names:
+            model.disable_pipe(name)
+    model.max_length = 5_000_000
+    return model
+
+def get_model():
+    """Return the shared model, loading it on first call; ``None`` if not installed."""
+    global _nlp, _model_state, _model_load_seconds
+    if _model_state in (MODEL_READY, MODEL_UNAVAILABLE):
+        return _nlp
+
+    with _model_lock:
+        if _model_state in (MODEL_READY, MODEL_UNAVAILABLE):
+            return _nlp
+        _model_state = MODEL_LOADING
+        started = time.perf_counter()
+        try:
+            _nlp = load_model()
+        finally:
+            _model_load_seconds = time.perf_counter() - started
+            _model_state = MODEL_READY if _nlp is not None else MODEL_UNAVAILABLE
+        # Move the model's objects out of the GC's tracked generations so
+        # collections in forked children do not touch (and copy) their pages.
+        gc.freeze()
+        return _nlp
+
+def model_installed() -> bool:
+    """Whether the model package is installed, checked without importing spaCy."""
+    return importlib.util.find_spec(MODEL_NAME) is not None
+
+def model_status() -> dict:
+    return {
+        "model": MODEL_NAME,
+        "state": _model_state,
+        "loadSeconds": round(_model_load_seconds, 3) if _model_load_seconds is not None else None,
+    }
+
+def warm_up_in_background() -> threading.Thread:
+    thread = threading.Thread(target=get_model, name="spacy-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+if NLP_PRELOAD:
+    # Load before the server forks its workers so they share the model's
+    # memory copy-on-write (e.g. gunicorn --preload).
+    get_model()
+
+class NlpFeatures:
+    """What the analyzers read from spaCy: entity spans and keyword tokens."""
+
+    __slots__ = ("entities", "tokens", "documents", "skipped_documents")
+
+    def __init__(self):
+        self.entities: List[Tuple[str, str]] = []
+        self.tokens: List[str] = []
+        self.documents = 0
+        self.skipped_documents = 0
+
+    def extend(self, other: "NlpFeatures") -> None:
+        self.entities.extend(other.entities)
+        self.tokens.extend(other.tokens)
+        self.documents += other.documents
+
+def split_documents(lines: List[str], max_chars: int = NLP_DOC_CHARS) -> List[str]:
+    documents = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) > max_chars:
+            documents.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        documents.append("\n".join(current))
+    return documents
+
+def extract_features(texts: Iterable[str], deadline: Optional[float] = None) -> NlpFeatures:
+    features = NlpFeatures()
+    nlp = get_model()
+    if nlp is None:
+        return features
+
+    for doc in nlp.pipe(texts, batch_size=NLP_BATCH_SIZE):
+        features.documents += 1
+        features.entities.extend(
+            (ent.text, ent.label_) for ent in doc.ents if ent.label_ in ENTITY_LABELS
+        )
+        features.tokens.extend(
+            token.text.lower() for token in doc
+            if token.is_alpha and not token.is_stop
+            and len(token.text) >= 3 and not token.is_punct
+        )
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+    return features
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pool_enabled = NLP_WORKERS > 0
+
+def use_in_process_nlp() -> None:
+    """Run spaCy in the calling process; used inside other worker processes."""
+    global _pool_enabled
+    _pool_enabled = False
+
+def _reset_after_fork() -> None:
+    # A fork can happen while another thread holds one of these locks (e.g.
+    # the warm-up thread loading the model); the child gets fresh ones and
+    # loads the model itself if it was not loaded yet. The parent's worker
+    # pool is unusable from the child.
+    global _model_lock, _model_state, _pool, _pool_lock
+    _model_lock = threading.Lock()
+    if _model_state == MODEL_LOADING:
+        _model_state = MODEL_NOT_LOADED
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_nlp_pool() -> Optional[ProcessPoolExecutor]:
+    """Persistent spaCy workers; each keeps its own loaded model between requests.
+
+    The model is loaded in this process before the pool is created, so forked
+    workers start with it already in (shared) memory.
+    """
+    global _pool
+    if not _pool_enabled or get_model() is None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=NLP_WORKERS)
+        return _pool
+
+def shutdown_nlp_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def run_nlp(lines: List[str], time_budget: float = NLP_TIME_BUDGET) -> Optional[NlpFeatures]:
+    """Run spaCy over all lines in batches, stopping once ``time_budget`` is spent.
+
+    Returns ``None`` when no model is installed. Documents that did not fit in
+    the budget are counted in ``skipped_documents``.
+    """
+    if get_model() is None:
+        return None
+
+    documents = split_documents(lines)
+    deadline = time.perf_counter() + time_budget
+    pool = get_nlp_pool()
+
+    if pool is None:
+        features = extract_features(documents, deadline)
+    else:
+        features = NlpFeatures()
+        batches = [documents[i:i + NLP_BATCH_SIZE] for i in range(0, len(documents), NLP_BATCH_SIZE)]
+        pending = deque()
+        for batch in batches:
+            if time.perf_counter() > deadline:
+                break
+            if len(pending) >= NLP_WORKERS * 2:
+                future = pending.popleft()
+                try:
+                    features.extend(future.result(timeout=max(0.0, deadline - time.perf_counter())))
+                except TimeoutError:
+                    # The budget is spent; the loop below cancels what is still pending.
+                    future.cancel()
+                    break
+            pending.append(pool.submit(extract_features, batch))
+        while pending:
+            future = pending.popleft()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                future.cancel()
+                continue
+            try:
+                features.extend(future.result(timeout=remaining))
+            except TimeoutError:
+                future.cancel()
+
+    features.skipped_documents = len(documents) - features.documents
+    return features
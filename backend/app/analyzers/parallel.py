@@ -0,0 +1,208 @@
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.config import PARSE_WORKERS, PARALLEL_MIN_BYTES, PARALLEL_SHARDS_PER_WORKER, JOB_SHARD_CHARS
+from app.analyzers.log_analyzer import LogStructureAccumulator, MISSING_TIMESTAMPS_SKIP
+from app.analyzers.entry_store import EntryBuffer, EntryWriter, entry_writer
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE
+from app.parsers.log_parser import ParseProfile
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        return _pool
+
+def shutdown_parse_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def split_shards(text: str, count: int) -> List[str]:
+    """Split ``text`` into at most ``count`` pieces on ``"\\n"`` boundaries.
+
+    Concatenating ``shard.split("\\n")`` over the shards gives exactly
+    ``text.split("\\n")``.
+    """
+    shards = []
+    target = max(1, len(text) // max(count, 1))
+    start = 0
+    while len(text) - start > target and len(shards) < count - 1:
+        cut = text.find("\n", start + target)
+        if cut == -1:
+            break
+        shards.append(text[start:cut])
+        start = cut + 1
+    shards.append(text[start:])
+    return shards
+
+def analyze_shard(shard: str, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                  json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0, time_resolution: int = 0,
+                  keep_rows: bool = False) -> LogStructureAccumulator:
+    """Accumulator for one shard; with ``keep_rows`` it carries the shard's
+    entry rows back for the coordinator to store."""
+    accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error, time_resolution,
+                                          EntryBuffer() if keep_rows else None)
+    accumulator.add_lines(shard.split("\n"))
+    return accumulator
+
+def analyze_logs_parallel(log_data: str, workers: int, sniff_lines: int = 0,
+                          missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                          json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0,
+                          time_resolution: int = 0, dataset_id: Optional[str] = None,
+                          profile: Optional[ParseProfile] = None) -> Dict[str, Any]:
+    """Parallel counterpart of ``analyze_logs_structure``.
+
+    The stripped payload is sharded on line boundaries, every shard is parsed
+    and aggregated in the process pool, and the partial accumulators are merged
+    in shard order, which yields the serial result. At most ``workers`` shards
+    of this request are in flight at a time. With ``dataset_id`` the entries
+    are stored in shard order as the shards are merged. ``profile`` receives
+    the parse profile of all shards.
+
+    With ``sniff_lines`` the text is analyzed serially: the sniffer's lock
+    and its release depend on every line before, which shards cannot know.
+    """
+    text = log_data.strip()
+    workers = min(workers, PARSE_WORKERS)
+    keep_rows = dataset_id is not None
+    with entry_writer(dataset_id) as writer:
+        accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                              time_resolution, writer)
+        if workers <= 1 or len(text) < PARALLEL_MIN_BYTES or sniff_lines:
+            accumulator.add_lines(text.split("\n"))
+            if profile is not None:
+                profile.merge(accumulator.profile)
+            return accumulator.result()
+
+        shards = split_shards(text, workers * PARALLEL_SHARDS_PER_WORKER)
+        pool = get_parse_pool()
+        pending = deque()
+
+        for shard in shards:
+            if len(pending) >= workers:
+                accumulator.merge(pending.popleft().result())
+            pending.append(pool.submit(analyze_shard, shard, sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                       time_resolution, keep_rows))
+        while pending:
+            accumulator.merge(pending.popleft().result())
+
+    if profile is not None:
+        profile.merge(accumulator.profile)
+    return accumulator.result()
+
+def feed_chunks(accumulator: LogStructureAccumulator, chunks: Iterable[str],
+                on_progress: Optional[Callable[[LogStructureAccumulator, int], None]] = None,
+                cancelled: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+    """Serial path of ``analyze_chunks_parallel``."""
+    consumed = 0
+    for chunk in chunks:
+        if cancelled is not None and cancelled.is_set():
+            return None
+        accumulator.feed(chunk)
+        consumed += len(chunk)
+        if on_progress:
+            on_progress(accumulator, consumed)
+    accumulator.close()
+    if on_progress:
+        # The last lines are only counted once the input ends.
+        on_progress(accumulator, consumed)
+    return accumulator.result()
+
+def analyze_chunks_parallel(chunks: Iterable[str], sniff_lines: int = 0,
+                            missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                            json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0,
+                            time_resolution: int = 0, dataset_id: Optional[str] = None,
+                            profile: Optional[ParseProfile] = None, shard_chars: int = JOB_SHARD_CHARS,
+                            on_progress: Optional[Callable[[LogStructureAccumulator, int], None]] = None,
+                            cancelled: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+    """``analyze_logs_parallel`` for text arriving in chunks, e.g. read from a file.
+
+    Shards of about ``shard_chars`` are cut only at a line break that has
+    non-blank text after it, so trailing whitespace is never inside a shard
+    that still has to be stripped, and the result equals analyzing the whole
+    text at once. ``on_progress`` gets the merged accumulator and the number
+    of characters consumed after every shard; setting ``cancelled`` stops the
+    analysis between shards and returns ``None``. ``dataset_id`` and
+    ``profile`` work as in ``analyze_logs_parallel``; with ``sniff_lines``
+    the chunks are likewise fed to one accumulator here, and progress and
+    cancellation apply per chunk.
+    """
+    keep_rows = dataset_id is not None
+    writer = EntryWriter(dataset_id) if keep_rows else None
+    accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error, time_resolution,
+                                          writer)
+    if sniff_lines:
+        try:
+            result = feed_chunks(accumulator, chunks, on_progress, cancelled)
+        finally:
+            if writer is not None:
+                writer.close()
+        if result is not None and profile is not None:
+            profile.merge(accumulator.profile)
+        return result
+
+    workers = max(1, PARSE_WORKERS)
+    pool = get_parse_pool()
+    pending = deque()
+    buffer = ""
+    started = False
+    consumed = 0
+
+    def merge_next() -> None:
+        nonlocal consumed
+        future, size = pending.popleft()
+        accumulator.merge(future.result())
+        consumed += size
+        if on_progress:
+            on_progress(accumulator, consumed)
+
+    def submit(shard: str, size: int) -> None:
+        if len(pending) >= workers:
+            merge_next()
+        pending.append((pool.submit(analyze_shard, shard, sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                    time_resolution, keep_rows), size))
+
+    try:
+        for chunk in chunks:
+            if cancelled is not None and cancelled.is_set():
+                return None
+            if not started:
+                stripped = chunk.lstrip()
+                consumed += len(chunk) - len(stripped)
+                chunk = stripped
+                started = bool(chunk)
+            buffer += chunk
+            if len(buffer) < shard_chars:
+                continue
+            last_text = len(buffer.rstrip()) - 1
+            cut = buffer.rfind("\n", 0, max(last_text, 0))
+            if cut == -1:
+                continue
+            submit(buffer[:cut], cut + 1)
+            buffer = buffer[cut + 1:]
+
+        if cancelled is not None and cancelled.is_set():
+            return None
+        submit(buffer.rstrip(), len(buffer))
+        while pending:
+            if cancelled is not None and cancelled.is_set():
+                return None
+            merge_next()
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        if writer is not None:
+            writer.close()
+
+    if profile is not None:
+        profile.merge(accumulator.profile)
+    return accumulator.result()
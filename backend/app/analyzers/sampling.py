@@ -0,0 +1,63 @@
+import math
+import random
+from typing import Dict, List
+
+# z for a two-sided 95% confidence interval.
+CONFIDENCE_LEVEL = 0.95
+Z_95 = 1.96
+
+class LineSample:
+    """Lines picked by ``stratified_sample``, in random order.
+
+    Any prefix of ``lines`` is itself a uniform sample of the picked lines,
+    so stopping early (e.g. at the spaCy time budget) keeps it unbiased.
+    """
+
+    def __init__(self, lines: List[str], total_lines: int, total_chars: int, strata: int):
+        self.lines = lines
+        self.total_lines = total_lines
+        self.total_chars = total_chars
+        self.strata = strata
+        self.chars = sum(len(line) + 1 for line in lines)
+
+def allocate(sizes: Dict[int, int], fraction: float) -> Dict[int, int]:
+    """Lines to take per stratum: ``fraction`` of each, rounded by largest
+    remainder, and at least one from every non-empty stratum."""
+    exact = {stratum: size * fraction for stratum, size in sizes.items()}
+    quotas = {stratum: int(share) for stratum, share in exact.items()}
+    leftover = round(sum(exact.values())) - sum(quotas.values())
+    for stratum in sorted(exact, key=lambda s: quotas[s] - exact[s])[:max(leftover, 0)]:
+        quotas[stratum] += 1
+    return {stratum: min(max(quota, 1), sizes[stratum]) for stratum, quota in quotas.items()}
+
+def stratified_sample(lines: List[str], strata: List[int], budget_chars: int, seed: int = 0) -> LineSample:
+    """About ``budget_chars`` characters of ``lines``, sampled at the same rate
+    from every stratum (``strata[i]`` is the stratum of ``lines[i]``).
+
+    The seed is fixed, so the same input always yields the same sample.
+    """
+    total_chars = sum(len(line) + 1 for line in lines)
+    fraction = min(1.0, budget_chars / total_chars) if total_chars else 1.0
+
+    members: Dict[int, List[int]] = {}
+    for index, stratum in enumerate(strata):
+        members.setdefault(stratum, []).append(index)
+    quotas = allocate({stratum: len(indices) for stratum, indices in members.items()}, fraction)
+
+    rng = random.Random(seed)
+    picked = []
+    for stratum, indices in members.items():
+        picked.extend(rng.sample(indices, quotas[stratum]))
+    rng.shuffle(picked)
+    return LineSample([lines[index] for index in picked], len(lines), total_chars, len(members))
+
+def margin_of_error(sampled: int, population: int) -> float:
+    """Half-width of the 95% interval for a share of lines estimated from a
+    uniform sample of ``sampled`` out of ``population`` lines, in the worst
+    case (a share of one half). Proportional stratification only narrows it."""
+    if sampled <= 0:
+        return 1.0
+    if sampled >= population:
+        return 0.0
+    correction = (population - sampled) / (population - 1)
+    return Z_95 * math.sqrt(0.25 / sampled * correction)
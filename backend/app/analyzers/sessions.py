@@ -0,0 +1,179 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.analyzers.log_analyzer import LogStructureAccumulator, MISSING_TIMESTAMPS_SKIP
+from app.analyzers.entry_store import EntryWriter
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE
+from app.parsers.log_parser import ParseProfile
+from app.config import SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS, SESSION_MAX_KEYS
+
+class AnalysisSession:
+    """A log analysis that grows as chunks of the same log are appended.
+
+    Appended text continues the previous chunk, so a line may be split across
+    appends. The result matches analyzing everything appended so far in one
+    request, and is memoized until the next append. With ``dataset_id`` the
+    entries are stored as they are appended, except for the last line, which
+    is stored once more text follows it or the session is closed. If the
+    dataset is deleted meanwhile, the session stops reporting ``datasetId``.
+    """
+
+    def __init__(self, session_id: str, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                 json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0, time_resolution: int = 0,
+                 dataset_id: Optional[str] = None, max_keys: int = SESSION_MAX_KEYS):
+        self.session_id = session_id
+        self.dataset_id = dataset_id
+        self.max_keys = max_keys
+        self.writer = EntryWriter(dataset_id) if dataset_id is not None else None
+        self.accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                                   time_resolution, self.writer)
+        self.lock = threading.Lock()
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.accessed_at = self.created_at
+        self.appends = 0
+        self.bytes_received = 0
+        self.pruned_keys = 0
+        self._result: Optional[Dict[str, Any]] = None
+
+    def append(self, chunk: str) -> ParseProfile:
+        """Add a chunk; returns the parse profile of the lines it completed."""
+        with self.lock:
+            self.accumulator.feed(chunk)
+            self._check_dataset()
+            profile, self.accumulator.profile = self.accumulator.profile, ParseProfile()
+            self.pruned_keys += self.accumulator.prune(self.max_keys)
+            self.appends += 1
+            self.bytes_received += len(chunk)
+            self.updated_at = time.time()
+            self._result = None
+        return profile
+
+    def close(self) -> None:
+        """Store the buffered last line and close the entry writer.
+
+        Called when the session leaves the store; its result stays readable.
+        """
+        with self.lock:
+            if self.writer is None:
+                return
+            self.accumulator.close()
+            self.accumulator.entry_sink = None
+            self._check_dataset()
+            self.writer.close()
+            self.writer = None
+            self._result = None
+
+    def _check_dataset(self) -> None:
+        if self.writer is not None and self.writer.lost:
+            self.dataset_id = None
+
+    def result(self) -> Dict[str, Any]:
+        with self.lock:
+            if self._result is None:
+                self._result = self.accumulator.snapshot()
+                if self.dataset_id is not None:
+                    self._result["datasetId"] = self.dataset_id
+            return self._result
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "sessionId": self.session_id,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+            "appends": self.appends,
+            "bytesReceived": self.bytes_received,
+            "linesProcessed": self.accumulator.total_lines,
+            # Non-zero means top errors, IPs and keywords are approximate.
+            "prunedKeys": self.pruned_keys,
+            "datasetId": self.dataset_id,
+        }
+
+class SessionStore:
+    """Live sessions, bounded by count (LRU eviction) and idle time (TTL).
+
+    Sessions leaving the store are closed, outside the store lock since that
+    waits for an append in progress.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions: "OrderedDict[str, AnalysisSession]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def create(self, sniff_lines: int = 0, missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+               json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0, time_resolution: int = 0,
+               dataset_id: Optional[str] = None) -> AnalysisSession:
+        session = AnalysisSession(uuid.uuid4().hex, sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                  time_resolution, dataset_id)
+        with self.lock:
+            removed = self._expire()
+            self.sessions[session.session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                removed.append(self.sessions.popitem(last=False)[1])
+                self.evictions += 1
+        close_sessions(removed)
+        return session
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        with self.lock:
+            removed = self._expire()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.accessed_at = time.time()
+                self.sessions.move_to_end(session_id)
+        close_sessions(removed)
+        return session
+
+    def delete(self, session_id: str) -> Optional[AnalysisSession]:
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def clear(self) -> None:
+        with self.lock:
+            removed = list(self.sessions.values())
+            self.sessions.clear()
+        close_sessions(removed)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            removed = self._expire()
+            sessions = [session.info() for session in self.sessions.values()]
+        close_sessions(removed)
+        return sessions
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "maxSessions": self.max_sessions,
+                "ttlSeconds": self.ttl_seconds,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _expire(self) -> List[AnalysisSession]:
+        """Remove idle sessions and return them, for the caller to close."""
+        deadline = time.time() - self.ttl_seconds
+        expired = []
+        # Sessions are kept in least-recently-used order, so idle ones come first.
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.accessed_at >= deadline:
+                break
+            expired.append(self.sessions.popitem(last=False)[1])
+            self.expirations += 1
+        return expired
+
+def close_sessions(sessions: List[AnalysisSession]) -> None:
+    for session in sessions:
+        session.close()
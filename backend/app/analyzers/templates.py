@@ -0,0 +1,107 @@
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+WILDCARD = "<*>"
+# A whitespace-separated token containing a digit: IDs, counters, hex values,
+# IPs, versioned paths. The lookbehind starts matches only at token starts.
+VARIABLE_TOKEN_PATTERN = re.compile(r"(?<!\S)\S*\d\S*")
+
+def mask_variables(messages: List[str]) -> List[str]:
+    """Replace every token containing a digit with ``<*>``.
+
+    The messages are masked in one regex pass over their joined text, unless
+    one of them spans several lines (e.g. a JSON message with ``\n``).
+    """
+    if not messages:
+        return []
+    joined = "\n".join(messages)
+    if joined.count("\n") != len(messages) - 1:
+        return [VARIABLE_TOKEN_PATTERN.sub(WILDCARD, message) for message in messages]
+    return VARIABLE_TOKEN_PATTERN.sub(WILDCARD, joined).split("\n")
+
+class Template:
+    __slots__ = ("template_id", "tokens", "count")
+
+    def __init__(self, template_id: int, tokens: List[str], count: int):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = count
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+class TemplateMiner:
+    """Online log template miner after Drain (He et al., ICWS 2017).
+
+    Messages are split on whitespace and routed through a fixed-depth tree:
+    the first level is the token count, the next ``depth - 2`` levels are the
+    leading tokens (``<*>`` for variable ones, or once a node has
+    ``max_children`` children). The leaf holds a few templates; the message
+    joins the most similar one if at least ``similarity`` of its positions
+    agree, turning the positions that differ into ``<*>``, or else starts a
+    new template. A message therefore costs O(tokens) plus a comparison with
+    the templates of its leaf.
+
+    Feed messages through ``mask_variables`` first so that numbers, IDs and
+    hex values do not spread over the tree.
+    """
+
+    def __init__(self, depth: int = 4, similarity: float = 0.4, max_children: int = 100):
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.root: Dict[int, dict] = {}
+        self.templates: List[Template] = []
+
+    def add(self, message: str, count: int = 1) -> Template:
+        tokens = message.split()
+        leaf = self._leaf(tokens)
+
+        best: Optional[Template] = None
+        best_score = (-1.0, -1)
+        for template in leaf:
+            same = wildcards = 0
+            for known, token in zip(template.tokens, tokens):
+                if known == WILDCARD:
+                    wildcards += 1
+                elif known == token:
+                    same += 1
+            # Prefer the closest template, then the one that is already more general.
+            score = (same / len(tokens) if tokens else 1.0, wildcards)
+            if score > best_score:
+                best, best_score = template, score
+
+        if best is None or best_score[0] < self.similarity:
+            best = Template(len(self.templates), tokens, 0)
+            self.templates.append(best)
+            leaf.append(best)
+        else:
+            for i, (known, token) in enumerate(zip(best.tokens, tokens)):
+                if known != token and known != WILDCARD:
+                    best.tokens[i] = WILDCARD
+        best.count += count
+        return best
+
+    def _leaf(self, tokens: List[str]) -> List[Template]:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            child = node.get(token)
+            if child is None:
+                key = token if token != WILDCARD and len(node) < self.max_children else WILDCARD
+                child = node.setdefault(key, {})
+            node = child
+        # Messages with fewer tokens than the tree is deep end at an inner node.
+        return node.setdefault(None, [])
+
+def group_by_template(message_counts: Mapping[str, int], miner: Optional[TemplateMiner] = None) -> List[Tuple[str, int]]:
+    """Templates and their total counts for already masked messages, most frequent first.
+
+    Messages are mined in the mapping's order, so merged counts that keep
+    first-seen order give the same templates as one pass over all lines.
+    """
+    miner = miner or TemplateMiner()
+    for message, count in message_counts.items():
+        miner.add(message, count)
+    ranked = sorted(miner.templates, key=lambda template: -template.count)
+    return [(template.text, template.count) for template in ranked]
@@ -0,0 +1,188 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.models.entry import LEVELS, UNIX_EPOCH
+from app.config import TIME_SERIES_MAX_BUCKETS, TIME_SERIES_WINDOW, TIME_SERIES_THRESHOLD
+
+SPIKE = "spike"
+DROP = "drop"
+# Series checked for anomalies, and in which direction.
+DETECTED_SERIES = {"total": (SPIKE, DROP), "ERROR": (SPIKE,), "WARNING": (SPIKE,)}
+MAX_REPORTED_ANOMALIES = 50
+# Entries a bucket must differ from its expected count by to be reported, so
+# sparse per-second series do not report every handful of entries.
+MIN_ANOMALY_EXCESS = 10
+# Raw keys buffered before they are folded into the sorted counts.
+COMPACT_AT = 1 << 20
+SECOND = timedelta(seconds=1)
+
+def moment_epochs(moments: List[datetime]) -> List[int]:
+    """Whole seconds since the Unix epoch; naive times count as UTC.
+
+    The timestamp parsers memoize by text, so runs of entries from the same
+    second share one datetime and are converted once.
+    """
+    epochs = []
+    last = None
+    epoch = 0
+    for moment in moments:
+        if moment is not last:
+            last = moment
+            if moment.tzinfo is None:
+                epoch = (moment - UNIX_EPOCH) // SECOND
+            else:
+                epoch = math.floor(moment.timestamp())
+        epochs.append(epoch)
+    return epochs
+
+class RateHistogram:
+    """Entry counts per second and level, mergeable and independent of input size.
+
+    Each timed entry becomes an int64 key ``epoch * len(LEVELS) + level``.
+    Keys are buffered in arrays per block and periodically folded into
+    sorted unique keys with counts, so memory follows the number of distinct
+    seconds rather than the number of entries.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.pending: List[Tuple[np.ndarray, Optional[np.ndarray]]] = []
+        self.pending_size = 0
+
+    def add(self, moments: List[datetime], levels: List[int]) -> None:
+        if not moments:
+            return
+        keys = np.array(moment_epochs(moments), dtype=np.int64) * len(LEVELS) + np.array(levels, dtype=np.int64)
+        self._push(keys, None)
+
+    def add_counts(self, moment: datetime, level_counts: List[int]) -> None:
+        epoch = moment_epochs([moment])[0]
+        keys = np.arange(len(LEVELS), dtype=np.int64) + epoch * len(LEVELS)
+        self._push(keys, np.array(level_counts, dtype=np.int64))
+
+    def merge(self, other: "RateHistogram") -> None:
+        self._push(other.keys, other.counts)
+        for keys, counts in other.pending:
+            self._push(keys, counts)
+
+    def _push(self, keys: np.ndarray, counts: Optional[np.ndarray]) -> None:
+        self.pending.append((keys, counts))
+        self.pending_size += len(keys)
+        if self.pending_size >= COMPACT_AT:
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [keys for keys, _ in self.pending])
+        counts = np.concatenate([self.counts] + [
+            np.ones(len(keys), dtype=np.int64) if counts is None else counts for keys, counts in self.pending
+        ])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.keys)).astype(np.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def series(self, resolution: int, max_buckets: int = TIME_SERIES_MAX_BUCKETS) -> Tuple[int, int, np.ndarray]:
+        """``(start, resolution, counts)`` with ``counts[level, bucket]``.
+
+        Buckets are ``resolution`` seconds wide and start at a multiple of it;
+        a wider resolution is used if the span would need more than
+        ``max_buckets`` of them.
+        """
+        self._compact()
+        if not len(self.keys):
+            return 0, resolution, np.zeros((len(LEVELS), 0), dtype=np.int64)
+        epochs, levels = np.divmod(self.keys, len(LEVELS))
+        first, last = int(epochs[0]), int(epochs[-1])
+        span = last // resolution - first // resolution + 1
+        if span > max_buckets:
+            resolution *= -(-span // max_buckets)
+        start = first // resolution * resolution
+        buckets = (epochs - start) // resolution
+        size = int(buckets[-1]) + 1
+        flat = np.bincount(levels * size + buckets, weights=self.counts, minlength=len(LEVELS) * size)
+        return start, resolution, flat.astype(np.int64).reshape(len(LEVELS), size)
+
+def rolling_robust_z(values: np.ndarray, window: int = TIME_SERIES_WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """Robust z-score of every point against the ``window`` points before it.
+
+    The expected value is the rolling median and the scale 1.4826 times the
+    rolling median absolute deviation, floored at the Poisson noise
+    ``sqrt(median)`` (and 1) so flat stretches do not turn every change into
+    an outlier. Points without a full window before them score 0.
+    """
+    values = values.astype(np.float64)
+    scores = np.zeros(len(values))
+    expected = values.copy()
+    if len(values) <= window:
+        return scores, expected
+    windows = sliding_window_view(values[:-1], window)
+    median = np.median(windows, axis=1)
+    mad = np.median(np.abs(windows - median[:, None]), axis=1)
+    scale = np.maximum(1.4826 * mad, np.sqrt(np.maximum(median, 1.0)))
+    scores[window:] = (values[window:] - median) / scale
+    expected[window:] = median
+    return scores, expected
+
+def detect_rate_anomalies(values: np.ndarray, directions: Tuple[str, ...], window: int = TIME_SERIES_WINDOW,
+                          threshold: float = TIME_SERIES_THRESHOLD) -> List[Dict[str, Any]]:
+    """Runs of consecutive buckets scoring beyond ``threshold`` and at least
+    ``MIN_ANOMALY_EXCESS`` entries off, one per run, described by the bucket
+    that deviates most."""
+    scores, expected = rolling_robust_z(values, window)
+    excess = values - expected
+    found = []
+    for direction in directions:
+        signed, signed_excess = (scores, excess) if direction == SPIKE else (-scores, -excess)
+        flagged = np.concatenate(([False], (signed > threshold) & (signed_excess >= MIN_ANOMALY_EXCESS), [False]))
+        edges = np.flatnonzero(np.diff(flagged.astype(np.int8)))
+        for run_start, run_end in zip(edges[::2], edges[1::2]):
+            peak = run_start + int(np.argmax(signed[run_start:run_end]))
+            found.append({
+                "type": direction,
+                "startBucket": int(run_start),
+                "endBucket": int(run_end - 1),
+                "count": int(values[peak]),
+                "expected": round(float(expected[peak]), 2),
+                "score": round(float(scores[peak]), 2),
+            })
+    return found
+
+def bucket_time(start: int, resolution: int, bucket: int) -> str:
+    return datetime.fromtimestamp(start + bucket * resolution, timezone.utc).isoformat()
+
+def build_time_series(histogram: RateHistogram, resolution: int) -> Dict[str, Any]:
+    """The ``timeSeries`` result section: entries per bucket in total and by
+    level, the error rate, and spikes and drops found in them."""
+    start, resolution, counts = histogram.series(resolution)
+    total = counts.sum(axis=0)
+    by_level = dict(zip(LEVELS, counts))
+    error_rate = np.divide(by_level["ERROR"], total, out=np.zeros(len(total)), where=total > 0)
+
+    anomalies = []
+    for name, directions in DETECTED_SERIES.items():
+        values = total if name == "total" else by_level[name]
+        for anomaly in detect_rate_anomalies(values, directions):
+            anomaly["series"] = name
+            anomalies.append(anomaly)
+    # Keep the strongest ones, reported in time order.
+    anomalies = sorted(anomalies, key=lambda anomaly: -abs(anomaly["score"]))[:MAX_REPORTED_ANOMALIES]
+    anomalies.sort(key=lambda anomaly: (anomaly["startBucket"], anomaly["series"]))
+    for anomaly in anomalies:
+        anomaly["start"] = bucket_time(start, resolution, anomaly.pop("startBucket"))
+        anomaly["end"] = bucket_time(start, resolution, anomaly.pop("endBucket") + 1)
+
+    return {
+        "start": bucket_time(start, resolution, 0) if len(total) else None,
+        "resolution": resolution,
+        "total": total.tolist(),
+        "byLevel": {level: values.tolist() for level, values in by_level.items()},
+        "errorRate": np.round(error_rate, 4).tolist(),
+        "anomalies": anomalies,
+    }
@@ -0,0 +1,134 @@
+"""Command-line analysis of log files on local disk.
+
+    python -m app analyze access.log app.log.gz --workers 4
+    python -m app analyze app.log --nlp -o result.json
+
+Prints the same JSON as ``/analyze-log`` (or ``/analyze`` with ``--nlp``);
+for several files, an object keyed by file name.
+"""
+import argparse
+import codecs
+import gzip
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.analyzers.log_analyzer import LogStructureAccumulator, MISSING_TIMESTAMPS_SKIP, MISSING_TIMESTAMPS_INHERIT
+from app.analyzers.executor import init_worker, nlp_analysis_job
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE, json_profiles
+from app.config import SKETCH_ERROR, TIME_SERIES_RESOLUTION, NLP_SAMPLE_CHARS
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+def is_gzip(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+def read_chunks(path: str, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Decoded text of ``path`` in chunks of about ``size`` bytes.
+
+    Plain files are memory-mapped and decoded straight from the mapping, so
+    the file is never copied into a bytes object; gzip files are streamed.
+    Invalid UTF-8 is replaced, as for uploads.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    if is_gzip(path):
+        with gzip.open(path, "rb") as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                yield decoder.decode(chunk)
+    elif os.path.getsize(path):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                for start in range(0, len(view), size):
+                    yield decoder.decode(view[start:start + size])
+    yield decoder.decode(b"", final=True)
+
+def read_text(path: str) -> str:
+    return "".join(read_chunks(path))
+
+def analyze_file(path: str, nlp: bool = False, sniff_lines: int = 0,
+                 missing_timestamps: str = MISSING_TIMESTAMPS_SKIP,
+                 json_profile: str = DEFAULT_JSON_PROFILE, sketch_error: float = 0.0,
+                 time_resolution: int = 0, nlp_sample_chars: int = NLP_SAMPLE_CHARS) -> Dict[str, Any]:
+    # The analyzers report problems with print(), which must not end up in
+    # the JSON written to stdout.
+    with redirect_stdout(sys.stderr):
+        if nlp:
+            result, _ = nlp_analysis_job(read_text(path), nlp_sample_chars)
+            return jsonable_encoder(result)
+
+        accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error,
+                                              time_resolution)
+        for chunk in read_chunks(path):
+            accumulator.feed(chunk)
+        accumulator.close()
+        return jsonable_encoder(accumulator.result())
+
+def analyze_files(paths: List[str], workers: int = 1, **options: Any) -> Dict[str, Dict[str, Any]]:
+    """Results by path; with ``workers`` > 1 files are analyzed in parallel processes."""
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        return {path: analyze_file(path, **options) for path in paths}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = [pool.submit(analyze_file, path, **options) for path in paths]
+        return {path: future.result() for path, future in zip(paths, futures)}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Аналіз лог-файлів без HTTP API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="проаналізувати лог-файли (звичайні або .gz)")
+    analyze.add_argument("files", nargs="+", metavar="FILE")
+    analyze.add_argument("--nlp", action="store_true", help="NLP-аналіз, як /analyze, замість структури логів")
+    analyze.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                         help="скільки файлів аналізувати паралельно")
+    analyze.add_argument("--sniff-lines", type=int, default=0)
+    analyze.add_argument("--missing-timestamps", choices=[MISSING_TIMESTAMPS_SKIP, MISSING_TIMESTAMPS_INHERIT],
+                         default=MISSING_TIMESTAMPS_SKIP)
+    analyze.add_argument("--json-profile", choices=sorted(json_profiles), default=DEFAULT_JSON_PROFILE)
+    analyze.add_argument("--sketch-error", type=float, default=SKETCH_ERROR,
+                         help="наближений підрахунок помилок, IP і ключових слів з цією похибкою; 0 - точний")
+    analyze.add_argument("--time-resolution", type=int, default=TIME_SERIES_RESOLUTION,
+                         help="часовий ряд записів з інтервалом у стільки секунд, зі сплесками і провалами; 0 - без нього")
+    analyze.add_argument("--nlp-sample-chars", type=int, default=NLP_SAMPLE_CHARS,
+                         help="з --nlp: spaCy бачить вибірку рядків на стільки символів; 0 - усі рядки")
+    analyze.add_argument("-o", "--output", help="файл для результату замість stdout")
+    analyze.add_argument("--indent", type=int, default=None)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    for path in args.files:
+        if not os.path.isfile(path):
+            print(f"Файл не знайдено: {path}", file=sys.stderr)
+            return 1
+
+    options = {"nlp": args.nlp}
+    if args.nlp:
+        options.update(nlp_sample_chars=args.nlp_sample_chars)
+    else:
+        options.update(sniff_lines=args.sniff_lines, missing_timestamps=args.missing_timestamps,
+                       json_profile=args.json_profile, sketch_error=args.sketch_error,
+                       time_resolution=args.time_resolution)
+    results = analyze_files(args.files, args.workers, **options)
+    output = results[args.files[0]] if len(args.files) == 1 else results
+
+    text = json.dumps(output, ensure_ascii=False, indent=args.indent)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+# Size of the process pool used by the parallel /analyze-log mode.
+PARSE_WORKERS = env_int("LOG_ANALYZER_PARSE_WORKERS", os.cpu_count() or 1)
+# Payloads smaller than this are always analyzed serially.
+PARALLEL_MIN_BYTES = env_int("LOG_ANALYZER_PARALLEL_MIN_BYTES", 1_000_000)
+# Shards per worker; more shards even out uneven line costs.
+PARALLEL_SHARDS_PER_WORKER = env_int("LOG_ANALYZER_PARALLEL_SHARDS_PER_WORKER", 4)
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return float(value)
+
+# spaCy worker processes for /analyze; 0 runs nlp.pipe in the request process.
+NLP_WORKERS = env_int("LOG_ANALYZER_NLP_WORKERS", max(0, min(4, (os.cpu_count() or 1) - 1)))
+# Characters of log text per spaCy document.
+NLP_DOC_CHARS = env_int("LOG_ANALYZER_NLP_DOC_CHARS", 20_000)
+# Documents per nlp.pipe batch (and per task sent to a worker).
+NLP_BATCH_SIZE = env_int("LOG_ANALYZER_NLP_BATCH_SIZE", 16)
+# Seconds the spaCy stage may spend on one request; later documents are skipped.
+NLP_TIME_BUDGET = env_float("LOG_ANALYZER_NLP_TIME_BUDGET", 10.0)
+# Load the spaCy model at import time, before a pre-forking server forks.
+NLP_PRELOAD = env_bool("LOG_ANALYZER_NLP_PRELOAD", False)
+# Load the spaCy model in a background thread when the app starts.
+NLP_WARMUP = env_bool("LOG_ANALYZER_NLP_WARMUP", True)
+# Characters of text spaCy sees per /analyze request at most; larger inputs send it a
+# sample stratified by level and position. 0 sends every line.
+NLP_SAMPLE_CHARS = env_int("LOG_ANALYZER_NLP_SAMPLE_CHARS", 1_000_000)
+# Position buckets the input is cut into for that sample, standing in for time buckets.
+NLP_SAMPLE_BUCKETS = env_int("LOG_ANALYZER_NLP_SAMPLE_BUCKETS", 24)
+# Bump when a change to the analyzers alters their output, so cached results are not reused.
+ANALYZER_VERSION = "4"
+# Analysis results kept in memory; 0 disables the in-memory cache.
+RESULT_CACHE_SIZE = env_int("LOG_ANALYZER_RESULT_CACHE_SIZE", 128)
+# Optional SQLite file for a persistent cache tier shared between processes.
+RESULT_CACHE_PATH = os.environ.get("LOG_ANALYZER_RESULT_CACHE_PATH", "").strip() or None
+# Rows kept in the SQLite tier.
+RESULT_CACHE_DISK_SIZE = env_int("LOG_ANALYZER_RESULT_CACHE_DISK_SIZE", 10_000)
+# Incremental /sessions analyses kept at once; the least recently used is evicted.
+SESSION_MAX_SESSIONS = env_int("LOG_ANALYZER_SESSION_MAX_SESSIONS", 64)
+# Seconds a session may stay idle before it is evicted.
+SESSION_TTL_SECONDS = env_int("LOG_ANALYZER_SESSION_TTL_SECONDS", 3600)
+# Distinct errors, IPs or keywords a session tracks before its least frequent ones are dropped.
+SESSION_MAX_KEYS = env_int("LOG_ANALYZER_SESSION_MAX_KEYS", 100_000)
+# Processes that run /analyze and /analyze-log off the server's event loop;
+# 0 runs them on the server's threadpool instead.
+ANALYSIS_WORKERS = env_int("LOG_ANALYZER_ANALYSIS_WORKERS", min(4, os.cpu_count() or 1))
+# Requests allowed to wait for a busy analysis worker before new ones get 429.
+ANALYSIS_QUEUE_SIZE = env_int("LOG_ANALYZER_ANALYSIS_QUEUE_SIZE", 16)
+# Seconds a request waits for its analysis before getting 504.
+ANALYSIS_TIMEOUT = env_float("LOG_ANALYZER_ANALYSIS_TIMEOUT", 300.0)
+# Background jobs run at once; further submissions wait in the job queue.
+JOB_WORKERS = env_int("LOG_ANALYZER_JOB_WORKERS", 2)
+# Jobs kept (queued, running and finished); beyond it new submissions get 429.
+JOB_MAX_JOBS = env_int("LOG_ANALYZER_JOB_MAX_JOBS", 100)
+# Seconds a finished job and its result are kept.
+JOB_RESULT_TTL_SECONDS = env_int("LOG_ANALYZER_JOB_RESULT_TTL_SECONDS", 3600)
+# Characters of log text per shard of a job; progress is reported per shard.
+JOB_SHARD_CHARS = env_int("LOG_ANALYZER_JOB_SHARD_CHARS", 4_000_000)
+# Field mappings for JSON logs, selected per request with ``json_profile``: a
+# JSON object or a path to a JSON file, see app.parsers.json_fields.
+JSON_PROFILES = os.environ.get("LOG_ANALYZER_JSON_PROFILES", "").strip() or None
+# JSON lines at least this long are decoded only up to the mapped fields when
+# possible; 0 always decodes them in full. Profiles may override it.
+JSON_PROJECTION_MIN_CHARS = env_int("LOG_ANALYZER_JSON_PROJECTION_MIN_CHARS", 0)
+# Default for ``sketch_error``: with a non-zero value, errors, IPs and keywords
+# are counted approximately in bounded memory, low by at most this fraction
+# of the total; 0 counts them exactly.
+SKETCH_ERROR = env_float("LOG_ANALYZER_SKETCH_ERROR", 0.0)
+# SQLite file for the parsed entries of analyses run with ``store``.
+ENTRY_STORE_PATH = (os.environ.get("LOG_ANALYZER_ENTRY_STORE_PATH", "").strip()
+                    or os.path.join(tempfile.gettempdir(), "log-analyzer-entries.sqlite3"))
+# Stored analyses kept; the oldest is deleted when a new one starts.
+ENTRY_STORE_MAX_DATASETS = env_int("LOG_ANALYZER_ENTRY_STORE_MAX_DATASETS", 20)
+# Default ``time_resolution`` in seconds: with a non-zero value the log
+# analysis adds entry counts per bucket of that width (1 - per second, 60 -
+# per minute) with spike and drop detection; 0 leaves them out.
+TIME_SERIES_RESOLUTION = env_int("LOG_ANALYZER_TIME_SERIES_RESOLUTION", 0)
+# Buckets per series at most; longer spans get proportionally wider buckets.
+TIME_SERIES_MAX_BUCKETS = env_int("LOG_ANALYZER_TIME_SERIES_MAX_BUCKETS", 10_000)
+# Buckets before each one that its expected value is the median of.
+TIME_SERIES_WINDOW = env_int("LOG_ANALYZER_TIME_SERIES_WINDOW", 30)
+# Robust z-score beyond which a bucket is reported as a spike or a drop.
+TIME_SERIES_THRESHOLD = env_float("LOG_ANALYZER_TIME_SERIES_THRESHOLD", 3.5)
+# Every this many blocks of 4096 lines one is parsed under a per-line timer
+# for the per-format parse times in /metrics; 0 turns the timing off.
+PARSE_PROFILE_SAMPLE = env_int("LOG_ANALYZER_PARSE_PROFILE_SAMPLE", 8)
+# Honour the X-Profile request header: run the request's analysis under
+# cProfile and save the profile for GET /profiles/{id}.
+PROFILING_ENABLED = env_bool("LOG_ANALYZER_PROFILING", False)
+# Directory for saved profiles.
+PROFILE_DIR = (os.environ.get("LOG_ANALYZER_PROFILE_DIR", "").strip()
+               or os.path.join(tempfile.gettempdir(), "log-analyzer-profiles"))
+# Saved profiles kept; the oldest are deleted beyond it.
+PROFILE_MAX_FILES = env_int("LOG_ANALYZER_PROFILE_MAX_FILES", 50)
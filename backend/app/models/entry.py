@@ -0,0 +1,65 @@
+import sys
+from datetime import datetime
+from typing import Optional
+
+from app.models.schemas import LogEntry
+
+LEVELS = ("ERROR", "WARNING", "INFO", "DEBUG")
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+ERROR, WARNING, INFO, DEBUG = range(len(LEVELS))
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+class ParsedEntry:
+    """Internal, slot-based form of ``LogEntry`` used on the analysis path.
+
+    The level is stored as a small int code and sources are interned, since a
+    large file repeats the same handful of hosts and IPs. Only the entries that
+    end up in a response are converted to pydantic models via ``to_model``.
+    ``malformed`` marks entries produced by ``create_malformed_entry``;
+    ``log_format`` is the format of the line (``apache``, ``application``,
+    ``system``, ``json`` or ``unknown``), also for malformed entries.
+    The timestamp arrives as a parsed datetime; its hour is kept for the time
+    analysis, and the ISO string is derived on demand, so nothing is parsed
+    twice and only returned entries pay for ``isoformat``. Lines without a
+    usable timestamp have ``moment``, ``hour`` and ``timestamp`` set to
+    ``None`` rather than the time of parsing.
+    """
+
+    __slots__ = ("moment", "hour", "level_code", "message", "source", "malformed", "log_format")
+
+    def __init__(
+        self,
+        timestamp: Optional[datetime],
+        level: str,
+        message: str,
+        source: Optional[str] = None,
+        malformed: bool = False,
+        log_format: str = "unknown",
+    ):
+        self.moment = timestamp
+        self.hour = timestamp.hour if timestamp is not None else None
+        self.level_code = LEVEL_CODES[level]
+        self.message = message
+        self.source = sys.intern(source) if source is not None else None
+        self.malformed = malformed
+        self.log_format = log_format
+
+    @property
+    def timestamp(self) -> Optional[str]:
+        return self.moment.isoformat() if self.moment is not None else None
+
+    def inherit_timestamp(self, moment: datetime) -> None:
+        self.moment = moment
+        self.hour = moment.hour
+
+    @property
+    def level(self) -> str:
+        return LEVELS[self.level_code]
+
+    def to_model(self) -> LogEntry:
+        return LogEntry(
+            timestamp=self.timestamp,
+            level=self.level,
+            message=self.message,
+            source=self.source
+        )
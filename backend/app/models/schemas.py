@@ -2,7 +2,7 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Literal, Optional
 
 class LogEntry(BaseModel):
-    timestamp: str
+    timestamp: Optional[str] = None
     level: Literal["ERROR", "WARNING", "INFO", "DEBUG"]
     message: str
     source: Optional[str] = None
@@ -0,0 +1,160 @@
+import json
+import os
+import re
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from app.config import JSON_PROFILES, JSON_PROJECTION_MIN_CHARS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_JSON_PROFILE = "default"
+FIELDS = ("timestamp", "level", "message", "source")
+
+def decode_json(text: str) -> Any:
+    """``json.loads``, through orjson when it is installed.
+
+    orjson rejects a few inputs the stdlib accepts (``NaN``, lone surrogates),
+    so its failures are retried with ``json``. It also reads integers beyond
+    64 bits as floats, which ``JsonFieldMapping.extract`` corrects for.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+# Searching every line for this costs more than decoding it, so it is only
+# done when a float or container makes a lossy big integer possible.
+LONG_NUMBER_PATTERN = re.compile(r"[0-9]{19}")
+
+# Top-level members of an object, one at a time. Keys with escapes and
+# nested values end the projection, see ``JsonFieldMapping.project``.
+MEMBER_PATTERN = re.compile(
+    r'\s*"([^"\\]*)"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d[\d.eE+-]*|true|false|null)\s*([,}])'
+)
+
+class JsonFieldMapping:
+    """Which keys of a JSON log line hold the timestamp, level, message and source.
+
+    Each field lists candidate keys; the first one present in the object is
+    used, even if its value is null, and a field with none of its keys falls
+    back to no timestamp, ``INFO``, the whole object, or no source.
+
+    With ``project_min_chars`` set, lines at least that long are first read
+    member by member from the start, and decoding stops as soon as the first
+    candidate of every field is found, so a large nested payload after them
+    is never decoded. Members that are skipped this way are not checked for
+    syntax errors, and of duplicated keys the first one wins instead of the
+    last. A line that needs more than that, e.g. because a nested value comes
+    first or a field is missing, is decoded in full.
+    """
+
+    def __init__(self, timestamp: Sequence[str] = ("timestamp", "time", "@timestamp"),
+                 level: Sequence[str] = ("level", "severity"),
+                 message: Sequence[str] = ("message", "msg"),
+                 source: Sequence[str] = ("source", "service", "component"),
+                 project_min_chars: int = JSON_PROJECTION_MIN_CHARS):
+        self.timestamp = tuple(timestamp)
+        self.level = tuple(level)
+        self.message = tuple(message)
+        self.source = tuple(source)
+        self.project_min_chars = project_min_chars
+        candidates = [self.timestamp, self.level, self.message, self.source]
+        self.wanted = {key for keys in candidates for key in keys}
+        # Once these are found no other candidate can take precedence.
+        self.primary = {keys[0] for keys in candidates if keys}
+
+    def extract(self, line: str) -> Tuple[Any, Any, Any, Any]:
+        """Timestamp, level, message and source of the JSON object in ``line``.
+
+        Raises ``ValueError`` if the line is not a JSON object.
+        """
+        data = None
+        if self.project_min_chars and len(line) >= self.project_min_chars:
+            data = self.project(line)
+        if data is None:
+            data = decode_json(line)
+        values = self.pick(data)
+        if orjson is not None and any(isinstance(value, (float, list, dict)) for value in values) \
+                and LONG_NUMBER_PATTERN.search(line):
+            values = self.pick(json.loads(line))
+        return values
+
+    def pick(self, data: Any) -> Tuple[Any, Any, Any, Any]:
+        if not isinstance(data, dict):
+            raise ValueError("JSON log line is not an object")
+        return (
+            first_present(data, self.timestamp),
+            first_present(data, self.level, "INFO"),
+            first_present(data, self.message, data),
+            first_present(data, self.source),
+        )
+
+    def project(self, line: str) -> Optional[Dict[str, Any]]:
+        """The mapped members of the object in ``line``, or ``None`` when the
+        line has to be decoded in full."""
+        start = line.find("{")
+        if start == -1 or line[:start].strip() or not line.rstrip().endswith("}"):
+            return None
+        data = {}
+        missing = set(self.primary)
+        position = start + 1
+        while True:
+            match = MEMBER_PATTERN.match(line, position)
+            if match is None:
+                return None
+            key, value, end = match.groups()
+            if key in self.wanted:
+                data[key] = decode_json(value)
+                missing.discard(key)
+                if not missing:
+                    return data
+            if end == "}":
+                # The whole object was read; a full decode is as cheap and
+                # also validates the values that were skipped.
+                return None
+            position = match.end()
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """The settings that affect parsing, e.g. for cache keys."""
+        fingerprint = {field: list(getattr(self, field)) for field in FIELDS}
+        fingerprint["project_min_chars"] = self.project_min_chars
+        return fingerprint
+
+def first_present(data: Dict[str, Any], keys: Tuple[str, ...], default: Any = None) -> Any:
+    for key in keys:
+        if key in data:
+            return data[key]
+    return default
+
+def load_profiles(spec: Optional[str]) -> Dict[str, JsonFieldMapping]:
+    """Profiles from ``LOG_ANALYZER_JSON_PROFILES``: a JSON object, or a path to a
+    file holding one, that maps a profile name to its field keys, e.g.
+    ``{"billing": {"timestamp": ["ts"], "level": ["lvl"], "project_min_chars": 4096}}``.
+    Fields a profile leaves out keep the default keys."""
+    profiles = {DEFAULT_JSON_PROFILE: JsonFieldMapping()}
+    if not spec:
+        return profiles
+    if not spec.lstrip().startswith("{"):
+        with open(os.path.expanduser(spec), encoding="utf-8") as f:
+            spec = f.read()
+    for name, settings in json.loads(spec).items():
+        unknown = set(settings) - set(FIELDS) - {"project_min_chars"}
+        if unknown:
+            raise ValueError(f"Unknown settings in JSON profile {name!r}: {', '.join(sorted(unknown))}")
+        settings = {key: [value] if isinstance(value, str) else value for key, value in settings.items()}
+        profiles[name] = JsonFieldMapping(**settings)
+    return profiles
+
+json_profiles = load_profiles(JSON_PROFILES)
+DEFAULT_JSON_FIELDS = json_profiles[DEFAULT_JSON_PROFILE]
+
+def get_json_fields(profile: str) -> JsonFieldMapping:
+    try:
+        return json_profiles[profile]
+    except KeyError:
+        raise ValueError(f"Unknown JSON profile: {profile}") from None
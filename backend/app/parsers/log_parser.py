@@ -1,22 +1,77 @@
 import re
-import json
-from typing import Optional
-from datetime import datetime
+import time
+from collections import Counter
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from app.models.schemas import LogEntry
+from app.models.entry import ParsedEntry
+from app.parsers.json_fields import JsonFieldMapping, DEFAULT_JSON_FIELDS
+from app.config import PARSE_PROFILE_SAMPLE
 from app.utils.log_utils import (
     normalize_log_level, 
-    safe_timestamp_apache, 
-    safe_timestamp_syslog, 
-    safe_timestamp
+    apache_timestamp, 
+    syslog_timestamp, 
+    iso_timestamp,
 )
 
-def parse_log_line(line: str) -> Optional[LogEntry]:
-    if not line.strip():
+APACHE_DETECT_PATTERN = re.compile(r'^\S+ \S+ \S+ \[.*?\] ".*?" \d+ \d+')
+APPLICATION_BRACKET_DETECT_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}.*?\[(ERROR|WARN|INFO|DEBUG)\]', re.IGNORECASE)
+APPLICATION_LEVEL_DETECT_PATTERN = re.compile(r'^(ERROR|WARN|INFO|DEBUG|TRACE)\s+', re.IGNORECASE)
+SYSTEM_DETECT_PATTERN = re.compile(r'^[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}')
+ISO_DETECT_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}')
+
+APACHE_PATTERN = re.compile(r'^(\S+) \S+ \S+ \[([^\]]+)\] "([^"]*)" (\d+) (\d+|-) "([^"]*)" "([^"]*)"')
+APPLICATION_PATTERNS = [
+    re.compile(r"^(\d{4}-\d{2}-\d{2}T[\d:.]+Z?)\s+\[(\w+)\]\s+(.+)$"),
+    re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+\[(\w+)\]\s+(.+)$"),
+    re.compile(r"^(\w+)\s+(\d{4}-\d{2}-\d{2}.*?)\s+(.+)$"),
+    re.compile(r"^\[(\w+)\]\s+(.+)$"),
+]
+# Patterns 0 and 1 merged into one alternation; tried in the same order.
+APPLICATION_TIMESTAMP_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}T[\d:.]+Z?|\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+\[(\w+)\]\s+(.+)$"
+)
+SYSTEM_PATTERN = re.compile(r'^([A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s+(.+)$')
+
+BRACKET_DETECT_LEVEL_PATTERN = re.compile(r'ERROR|WARN|INFO|DEBUG', re.IGNORECASE)
+LEADING_DETECT_LEVEL_PATTERN = re.compile(r'ERROR|WARN|INFO|DEBUG|TRACE', re.IGNORECASE)
+
+def parse_log_line(line: str, json_fields: JsonFieldMapping = DEFAULT_JSON_FIELDS) -> Optional[ParsedEntry]:
+    stripped = line.strip()
+    if not stripped:
         return None
-    
-    log_format = detect_log_format(line)
-    
+
+    # Fast paths: a full extraction match that also proves the line would have
+    # been classified the same way by detect_log_format, so the line is scanned
+    # once. Anything else goes through the regular detect-then-parse route.
+    if '] "' in line:
+        match = APACHE_PATTERN.match(line)
+        if match and match.group(5) != "-":
+            return build_apache_entry(line, match)
+        if APACHE_DETECT_PATTERN.match(stripped):
+            return parse_apache_log(line)
+
+    if stripped.startswith('{') and stripped.endswith('}'):
+        return parse_json_log(line, json_fields)
+
+    match = APPLICATION_TIMESTAMP_PATTERN.match(line)
+    if match and BRACKET_DETECT_LEVEL_PATTERN.fullmatch(match.group(2)):
+        timestamp, level, message = match.groups()
+        return build_application_entry(timestamp, level, message)
+
+    match = APPLICATION_PATTERNS[2].match(line)
+    if match and LEADING_DETECT_LEVEL_PATTERN.fullmatch(match.group(1)):
+        level, timestamp, message = match.groups()
+        return build_application_entry(timestamp, level, message)
+
+    match = SYSTEM_PATTERN.match(line)
+    if match:
+        return build_system_entry(match)
+
+    return parse_detected_line(line, detect_log_format(stripped), json_fields)
+
+def parse_detected_line(line: str, log_format: str,
+                        json_fields: JsonFieldMapping = DEFAULT_JSON_FIELDS) -> Optional[ParsedEntry]:
     if log_format == "apache":
         return parse_apache_log(line)
     elif log_format == "application":
@@ -24,11 +79,11 @@ def parse_log_line(line: str) -> Optional[LogEntry]:
     elif log_format == "system":
         return parse_system_log(line)
     elif log_format == "json":
-        return parse_json_log(line)
+        return parse_json_log(line, json_fields)
     else:
         if is_potentially_valid_log(line):
-            return LogEntry(
-                timestamp=datetime.utcnow().isoformat(),
+            return ParsedEntry(
+                timestamp=None,
                 level="INFO",
                 message=line.strip(),
                 source="unknown_format"
@@ -39,59 +94,62 @@ def parse_log_line(line: str) -> Optional[LogEntry]:
 def detect_log_format(line: str) -> str:
     line = line.strip()
     
-    if re.match(r'^\S+ \S+ \S+ \[.*?\] ".*?" \d+ \d+', line):
+    if APACHE_DETECT_PATTERN.match(line):
         return "apache"
     
     if line.startswith('{') and line.endswith('}'):
         return "json"
     
-    if re.match(r'^\d{4}-\d{2}-\d{2}.*?\[(ERROR|WARN|INFO|DEBUG)\]', line, re.IGNORECASE):
+    if APPLICATION_BRACKET_DETECT_PATTERN.match(line):
         return "application"
     
-    if re.match(r'^(ERROR|WARN|INFO|DEBUG|TRACE)\s+', line, re.IGNORECASE):
+    if APPLICATION_LEVEL_DETECT_PATTERN.match(line):
         return "application"
     
-    if re.match(r'^[A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}', line):
+    if SYSTEM_DETECT_PATTERN.match(line):
         return "system"
     
-    if re.match(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}', line):
+    if ISO_DETECT_PATTERN.match(line):
         return "application"
     
     return "unknown"
 
+LETTER_PATTERN = re.compile(r'[a-zA-Z]')
+SUSPICIOUS_ENDINGS = [
+    re.compile(r'\s+$'),
+    re.compile(r':\d{1,2}$'),
+    re.compile(r'\[$'),
+    re.compile(r'"[^"]*$'),
+]
+
 def is_potentially_valid_log(line: str) -> bool:
     line = line.strip()
     
     if len(line) < 10:
         return False
     
-    if not re.search(r'[a-zA-Z]', line):
+    if not LETTER_PATTERN.search(line):
         return False
     
-    suspicious_endings = [
-        r'\s+$',
-        r':\d{1,2}$',
-        r'\[$',
-        r'"[^"]*$',
-    ]
-    
-    for pattern in suspicious_endings:
-        if re.search(pattern, line):
+    for pattern in SUSPICIOUS_ENDINGS:
+        if pattern.search(line):
             return False
     
     return True
 
-def parse_apache_log(line: str) -> Optional[LogEntry]:
-    pattern = r'^(\S+) \S+ \S+ \[([^\]]+)\] "([^"]*)" (\d+) (\d+|-) "([^"]*)" "([^"]*)"'
-    match = re.match(pattern, line)
+def parse_apache_log(line: str) -> Optional[ParsedEntry]:
+    match = APACHE_PATTERN.match(line)
     
     if not match:
-        return create_malformed_entry(line, "Invalid Apache log format")
+        return create_malformed_entry(line, "Invalid Apache log format", "apache")
     
+    return build_apache_entry(line, match)
+
+def build_apache_entry(line: str, match: re.Match) -> ParsedEntry:
     ip, timestamp, request, status, size, referer, user_agent = match.groups()
     
     if not all([ip, timestamp, request, status]):
-        return create_malformed_entry(line, "Incomplete Apache log entry - missing critical fields")
+        return create_malformed_entry(line, "Incomplete Apache log entry - missing critical fields", "apache")
     
     try:
         status_code = int(status)
@@ -102,89 +160,245 @@ def parse_apache_log(line: str) -> Optional[LogEntry]:
         else:
             level = "INFO"
     except ValueError:
-        return create_malformed_entry(line, "Invalid HTTP status code")
+        return create_malformed_entry(line, "Invalid HTTP status code", "apache")
     
-    return LogEntry(
-        timestamp=safe_timestamp_apache(timestamp),
+    return ParsedEntry(
+        timestamp=apache_timestamp(timestamp),
         level=normalize_log_level(level),
         message=f"{request} -> {status} {size}",
-        source=ip
+        source=ip,
+        log_format="apache"
     )
 
-def parse_application_log(line: str) -> Optional[LogEntry]:
-    patterns = [
-        r"^(\d{4}-\d{2}-\d{2}T[\d:.]+Z?)\s+\[(\w+)\]\s+(.+)$",
-        r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+\[(\w+)\]\s+(.+)$",
-        r"^(\w+)\s+(\d{4}-\d{2}-\d{2}.*?)\s+(.+)$",
-        r"^\[(\w+)\]\s+(.+)$",
-    ]
-    
-    for i, pattern in enumerate(patterns):
-        match = re.match(pattern, line)
+def parse_application_log(line: str) -> Optional[ParsedEntry]:
+    for i, pattern in enumerate(APPLICATION_PATTERNS):
+        match = pattern.match(line)
         if match:
             if i == 0 or i == 1:
                 timestamp, level, message = match.groups()
-                return LogEntry(
-                    timestamp=safe_timestamp(timestamp),
-                    level=normalize_log_level(level),
-                    message=message
-                )
+                return build_application_entry(timestamp, level, message)
             elif i == 2:
                 level, timestamp, message = match.groups()
-                return LogEntry(
-                    timestamp=safe_timestamp(timestamp),
-                    level=normalize_log_level(level),
-                    message=message
-                )
+                return build_application_entry(timestamp, level, message)
             elif i == 3:
                 level, message = match.groups()
-                return LogEntry(
-                    timestamp=datetime.utcnow().isoformat(),
+                return ParsedEntry(
+                    timestamp=None,
                     level=normalize_log_level(level),
-                    message=message
+                    message=message,
+                    log_format="application"
                 )
     
     return None
 
-def parse_system_log(line: str) -> Optional[LogEntry]:
-    pattern = r'^([A-Za-z]{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+(\S+)\s+(.+)$'
-    match = re.match(pattern, line)
+def build_application_entry(timestamp: str, level: str, message: str) -> ParsedEntry:
+    return ParsedEntry(
+        timestamp=iso_timestamp(timestamp),
+        level=normalize_log_level(level),
+        message=message,
+        log_format="application"
+    )
+
+def parse_system_log(line: str) -> Optional[ParsedEntry]:
+    match = SYSTEM_PATTERN.match(line)
     
     if match:
-        timestamp_str, hostname, message = match.groups()
-        level = "ERROR" if any(word in message.lower() for word in ["error", "fail", "critical"]) else "INFO"
-        
-        return LogEntry(
-            timestamp=safe_timestamp_syslog(timestamp_str),
-            level=normalize_log_level(level),
-            message=message,
-            source=hostname
-        )
+        return build_system_entry(match)
     
     return None
 
-def parse_json_log(line: str) -> Optional[LogEntry]:
+def build_system_entry(match: re.Match) -> ParsedEntry:
+    timestamp_str, hostname, message = match.groups()
+    level = "ERROR" if any(word in message.lower() for word in ["error", "fail", "critical"]) else "INFO"
+    
+    return ParsedEntry(
+        timestamp=syslog_timestamp(timestamp_str),
+        level=normalize_log_level(level),
+        message=message,
+        source=hostname,
+        log_format="system"
+    )
+
+def parse_json_log(line: str, json_fields: JsonFieldMapping = DEFAULT_JSON_FIELDS) -> Optional[ParsedEntry]:
     try:
-        data = json.loads(line)
+        timestamp, level, message, source = json_fields.extract(line)
         
-        timestamp = data.get('timestamp', data.get('time', data.get('@timestamp')))
-        level = data.get('level', data.get('severity', 'INFO'))
-        message = data.get('message', data.get('msg', str(data)))
-        source = data.get('source', data.get('service', data.get('component')))
-        
-        return LogEntry(
-            timestamp=safe_timestamp(timestamp) if timestamp else datetime.utcnow().isoformat(),
+        return ParsedEntry(
+            timestamp=iso_timestamp(timestamp) if timestamp else None,
             level=normalize_log_level(str(level)),
             message=str(message),
-            source=str(source) if source else None
+            source=str(source) if source else None,
+            log_format="json"
         )
-    except (json.JSONDecodeError, Exception):
-        return create_malformed_entry(line, "Invalid JSON log format")
+    except Exception:
+        return create_malformed_entry(line, "Invalid JSON log format", "json")
 
-def create_malformed_entry(line: str, reason: str) -> LogEntry:
-    return LogEntry(
-        timestamp=datetime.utcnow().isoformat(),
+def create_malformed_entry(line: str, reason: str, log_format: str = "unknown") -> ParsedEntry:
+    return ParsedEntry(
+        timestamp=None,
         level="ERROR",
         message=f"MALFORMED LOG: {reason} - Original: {line[:100]}{'...' if len(line) > 100 else ''}",
-        source="log_parser"
+        source="log_parser",
+        malformed=True,
+        log_format=log_format
     )
+
+FORMAT_PARSERS = {
+    "apache": parse_apache_log,
+    "application": parse_application_log,
+    "system": parse_system_log,
+    "json": parse_json_log,
+}
+
+class FormatSniffer:
+    """Locks onto the dominant format of a homogeneous stream.
+
+    The first ``sample_size`` non-blank lines go through full detection. If a
+    single known format parsed at least ``min_share`` of them, its parser is
+    used directly for the rest of the stream and a line it cannot parse
+    (``None`` or a malformed entry) falls back to ``parse_log_line``. A mixed
+    sample disables locking and every later line uses full detection; so does
+    a lock whose misses reach ``sample_size`` and outnumber its hits.
+
+    ``hits`` counts lines handled by the locked parser, ``misses`` counts lines
+    after the sample that needed full detection.
+    """
+
+    def __init__(self, sample_size: int = 50, min_share: float = 0.8,
+                 json_fields: JsonFieldMapping = DEFAULT_JSON_FIELDS):
+        self.json_fields = json_fields
+        self.parsers = FORMAT_PARSERS
+        if json_fields is not DEFAULT_JSON_FIELDS:
+            self.parsers = {**FORMAT_PARSERS, "json": partial(parse_json_log, json_fields=json_fields)}
+        self.sample_size = sample_size
+        self.min_share = min_share
+        self.sampled_lines = 0
+        self.sample_formats: Counter = Counter()
+        self.sampling = sample_size > 0
+        self.locked_format: Optional[str] = None
+        self.locked_parser = None
+        self.released = False
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, line: str) -> Optional[ParsedEntry]:
+        if not line.strip():
+            return None
+
+        if self.locked_parser is not None:
+            entry = self.locked_parser(line)
+            if entry is not None and not entry.malformed:
+                self.hits += 1
+                return entry
+            if self.misses >= self.sample_size and self.misses >= self.hits:
+                self.locked_parser = None
+                self.released = True
+        elif self.sampling:
+            return self._sample(line)
+
+        self.misses += 1
+        return parse_log_line(line, self.json_fields)
+
+    def _sample(self, line: str) -> Optional[ParsedEntry]:
+        log_format = detect_log_format(line)
+        entry = parse_detected_line(line, log_format, self.json_fields)
+        if entry is not None and not entry.malformed:
+            self.sample_formats[log_format] += 1
+        self.sampled_lines += 1
+
+        if self.sampled_lines >= self.sample_size:
+            self.sampling = False
+            log_format, count = self.sample_formats.most_common(1)[0] if self.sample_formats else ("unknown", 0)
+            if log_format in self.parsers and count >= self.sampled_lines * self.min_share:
+                self.locked_format = log_format
+                self.locked_parser = self.parsers[log_format]
+        return entry
+
+    def merge(self, other: "FormatSniffer") -> None:
+        self.sampled_lines += other.sampled_lines
+        self.sample_formats.update(other.sample_formats)
+        if self.locked_format is None or self.locked_format == other.locked_format:
+            self.locked_format = other.locked_format
+        else:
+            self.locked_format = "mixed"
+        self.released = self.released or other.released
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def stats(self) -> Dict[str, Any]:
+        checked = self.hits + self.misses
+        return {
+            "lockedFormat": self.locked_format,
+            "sampledLines": self.sampled_lines,
+            "sampleFormats": dict(self.sample_formats),
+            "released": self.released,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / checked, 4) if checked else None,
+        }
+
+class ParseProfile:
+    """Entries parsed per format, and how long parsing them took.
+
+    Counts are exact. Timing every line would cost a noticeable share of the
+    parse itself, so only every ``sample_every``-th block of lines (starting
+    with the first) is parsed under a per-line timer, and ``seconds``
+    extrapolates each format's mean from those lines to all its entries.
+    Profiles merge like the accumulators that own them.
+    """
+
+    def __init__(self, sample_every: int = PARSE_PROFILE_SAMPLE):
+        self.sample_every = sample_every
+        self.blocks = 0
+        self.lines = 0
+        self.entries: Counter = Counter()
+        self.malformed: Counter = Counter()
+        self.timed_entries: Counter = Counter()
+        self.timed_seconds: Dict[str, float] = {}
+
+    def parse_block(self, parse: Callable[[str], Optional[ParsedEntry]],
+                    lines: List[str]) -> Iterable[Optional[ParsedEntry]]:
+        """``parse`` applied to every line, timed when the block is sampled."""
+        self.blocks += 1
+        self.lines += len(lines)
+        if self.sample_every <= 0 or (self.blocks - 1) % self.sample_every:
+            return map(parse, lines)
+
+        clock = time.perf_counter
+        timed_entries = self.timed_entries
+        timed_seconds = self.timed_seconds
+        parsed = []
+        for line in lines:
+            started = clock()
+            entry = parse(line)
+            elapsed = clock() - started
+            parsed.append(entry)
+            if entry is not None:
+                log_format = entry.log_format
+                timed_entries[log_format] += 1
+                timed_seconds[log_format] = timed_seconds.get(log_format, 0.0) + elapsed
+        return parsed
+
+    def count(self, formats: List[str], malformed: List[str]) -> None:
+        self.entries.update(formats)
+        self.malformed.update(malformed)
+
+    def merge(self, other: "ParseProfile") -> None:
+        self.blocks += other.blocks
+        self.lines += other.lines
+        self.entries.update(other.entries)
+        self.malformed.update(other.malformed)
+        self.timed_entries.update(other.timed_entries)
+        for log_format, seconds in other.timed_seconds.items():
+            self.timed_seconds[log_format] = self.timed_seconds.get(log_format, 0.0) + seconds
+
+    def seconds(self) -> Dict[str, float]:
+        """Estimated parse time per format; a format that never fell in a
+        timed block gets the mean of all timed entries."""
+        timed = sum(self.timed_entries.values())
+        overall = sum(self.timed_seconds.values()) / timed if timed else 0.0
+        return {
+            log_format: count * (self.timed_seconds[log_format] / self.timed_entries[log_format]
+                                 if self.timed_entries[log_format] else overall)
+            for log_format, count in self.entries.items()
+        }
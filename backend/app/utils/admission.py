@@ -0,0 +1,54 @@
+import math
+import threading
+from typing import Any, Dict
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Caps the analyses running or waiting at once.
+
+    ``workers`` analyses run concurrently and up to ``queue_size`` more may
+    wait for them; beyond that ``acquire`` raises ``Overloaded`` with a retry
+    hint derived from the recent average duration.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = max(workers, 1)
+        self.capacity = self.workers + max(queue_size, 0)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.average_seconds = 1.0
+
+    def acquire(self) -> None:
+        with self.lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise Overloaded(self._retry_after())
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self, seconds: float) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            # Exponential moving average of how long an admitted analysis takes.
+            self.average_seconds += (seconds - self.average_seconds) * 0.2
+
+    def _retry_after(self) -> int:
+        waiting = self.in_flight - self.workers + 1
+        return max(1, math.ceil(self.average_seconds * waiting / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "inFlight": self.in_flight,
+                "capacity": self.capacity,
+                "workers": self.workers,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "averageSeconds": round(self.average_seconds, 3),
+            }
@@ -0,0 +1,41 @@
+from bisect import bisect_right
+from typing import Dict, List
+
+class KeywordMatcher:
+    """Multi-pattern substring matcher mapping keywords to bit flags.
+
+    Keywords shared by several lists are merged into one entry with the union
+    of their flags, so every distinct keyword is searched once. ``scan_lines``
+    works on a whole block: each keyword is located with ``str.find`` over the
+    joined text (a C-level scan) and its flags are OR-ed into the line the hit
+    falls in, skipping straight to the next line after a hit. The result equals
+    checking ``kw in line`` for every keyword and line.
+    """
+
+    def __init__(self, keyword_flags: Dict[str, int]):
+        self.keyword_flags = dict(keyword_flags)
+        self.items = list(self.keyword_flags.items())
+
+    def scan_lines(self, lines: List[str]) -> List[int]:
+        masks = [0] * len(lines)
+        if not lines:
+            return masks
+
+        text = "\n".join(lines)
+        starts = []
+        offset = 0
+        for line in lines:
+            starts.append(offset)
+            offset += len(line) + 1
+
+        find = text.find
+        last = len(lines) - 1
+        for keyword, flags in self.items:
+            position = find(keyword)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                masks[index] |= flags
+                if index == last:
+                    break
+                position = find(keyword, starts[index + 1])
+        return masks
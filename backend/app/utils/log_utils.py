@@ -1,58 +1,179 @@
-from typing import Literal
-from datetime import datetime
+import re
+import time
+from functools import lru_cache
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+
+# Same as r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b", written to start with a digit
+# class so the regex engine can skip non-digit positions quickly.
+IP_PATTERN = re.compile(r"[0-9](?<!\w[0-9])[0-9]{0,2}\.(?:[0-9]{1,3}\.){2}[0-9]{1,3}\b")
+
+LEVEL_MAPPING = {
+    "ERROR": "ERROR",
+    "ERR": "ERROR", 
+    "CRITICAL": "ERROR",
+    "CRIT": "ERROR",
+    "FATAL": "ERROR",
+    "PANIC": "ERROR",
+    "EMERGENCY": "ERROR",
+    "EMERG": "ERROR",
+    "ALERT": "ERROR",
+    "WARNING": "WARNING",
+    "WARN": "WARNING",
+    "CAUTION": "WARNING",
+    "INFO": "INFO",
+    "INFORMATION": "INFO",
+    "NOTICE": "INFO",
+    "NOTE": "INFO",
+    "DEBUG": "DEBUG",
+    "TRACE": "DEBUG",
+    "VERBOSE": "DEBUG",
+    "FINE": "DEBUG",
+    "FINEST": "DEBUG",
+}
 
 def normalize_log_level(level: str) -> Literal["ERROR", "WARNING", "INFO", "DEBUG"]:
     if not level:
         return "INFO"
     
-    level_upper = level.upper().strip()
-    
-    level_mapping = {
-        "ERROR": "ERROR",
-        "ERR": "ERROR", 
-        "CRITICAL": "ERROR",
-        "CRIT": "ERROR",
-        "FATAL": "ERROR",
-        "PANIC": "ERROR",
-        "EMERGENCY": "ERROR",
-        "EMERG": "ERROR",
-        "ALERT": "ERROR",
-        "WARNING": "WARNING",
-        "WARN": "WARNING",
-        "CAUTION": "WARNING",
-        "INFO": "INFO",
-        "INFORMATION": "INFO",
-        "NOTICE": "INFO",
-        "NOTE": "INFO",
-        "DEBUG": "DEBUG",
-        "TRACE": "DEBUG",
-        "VERBOSE": "DEBUG",
-        "FINE": "DEBUG",
-        "FINEST": "DEBUG",
-    }
-    
-    return level_mapping.get(level_upper, "INFO")
+    return LEVEL_MAPPING.get(level.upper().strip(), "INFO")
+
+TIMESTAMP_MEMO_SIZE = 4096
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
 
-def safe_timestamp_apache(timestamp_str: str) -> str:
+# The parsers below return datetimes, or None when the text is not a valid
+# timestamp. Entries format them with isoformat() only when they are
+# returned, which is the expensive part for aware times.
+
+@lru_cache(maxsize=64)
+def _fixed_offset(sign: str, hours: int, minutes: int) -> timezone:
+    offset = timedelta(hours=hours, minutes=minutes)
+    return timezone(-offset if sign == "-" else offset)
+
+@lru_cache(maxsize=TIMESTAMP_MEMO_SIZE)
+def _parse_apache(value: str) -> datetime:
+    # Layout "10/Oct/2000:13:55:36 -0700" read at fixed offsets; anything else
+    # goes to strptime, which also accepts one-digit days and other offsets.
+    if (len(value) == 26 and value.isascii() and value[2] == "/" and value[6] == "/"
+            and value[11] == ":" and value[14] == ":" and value[17] == ":" and value[20] == " "
+            and value[21] in "+-" and value[24] in "012345"):
+        month = MONTHS.get(value[3:6])
+        digits = value[0:2] + value[7:11] + value[12:14] + value[15:17] + value[18:20] + value[22:26]
+        if month and digits.isdigit():
+            return datetime(
+                int(value[7:11]), month, int(value[0:2]),
+                int(value[12:14]), int(value[15:17]), int(value[18:20]),
+                tzinfo=_fixed_offset(value[21], int(value[22:24]), int(value[24:26])),
+            )
+    return datetime.strptime(value, "%d/%b/%Y:%H:%M:%S %z")
+
+def apache_timestamp(value: str) -> Optional[datetime]:
     try:
-        dt = datetime.strptime(timestamp_str, "%d/%b/%Y:%H:%M:%S %z")
-        return dt.isoformat()
+        return _parse_apache(value)
     except Exception:
-        return datetime.utcnow().isoformat()
+        return None
+
+@lru_cache(maxsize=TIMESTAMP_MEMO_SIZE)
+def _parse_syslog(year: int, value: str) -> datetime:
+    # "Oct 11 22:14:15" (any whitespace, one- or two-digit day).
+    parts = value.split()
+    if len(parts) == 3 and value.isascii():
+        month = MONTHS.get(parts[0])
+        day, clock = parts[1], parts[2]
+        if (month and len(day) <= 2 and day.isdigit() and len(clock) == 8
+                and clock[2] == ":" and clock[5] == ":"
+                and (clock[0:2] + clock[3:5] + clock[6:8]).isdigit()):
+            return datetime(year, month, int(day), int(clock[0:2]), int(clock[3:5]), int(clock[6:8]))
+    return datetime.strptime(f"{year} {value}", "%Y %b %d %H:%M:%S")
+
+_current_year = 0
+_current_year_until = 0.0
 
-def safe_timestamp_syslog(timestamp_str: str) -> str:
+def current_year() -> int:
+    """``datetime.now().year``, re-read at most once a minute."""
+    global _current_year, _current_year_until
+    now = time.time()
+    if now >= _current_year_until:
+        _current_year = datetime.now().year
+        _current_year_until = now + 60
+    return _current_year
+
+def syslog_timestamp(value: str) -> Optional[datetime]:
     try:
-        current_year = datetime.now().year
-        dt = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
-        return dt.isoformat()
+        return _parse_syslog(current_year(), value)
     except Exception:
-        return datetime.utcnow().isoformat()
+        return None
 
-def safe_timestamp(value: str) -> str:
+def iso_timestamp(value: str) -> Optional[datetime]:
+    # fromisoformat is implemented in C and beats a memo lookup plus handling
+    # of the fractional part in Python, so ISO strings are not memoized.
     try:
-        return datetime.fromisoformat(value).isoformat()
+        return datetime.fromisoformat(value)
     except Exception:
         try:
-            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").isoformat()
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
         except Exception:
-            return datetime.utcnow().isoformat()
+            return None
+
+class LineSplitter:
+    """Incremental equivalent of ``text.strip().split("\\n")`` for chunked input.
+
+    Only the current partial line, the last non-blank line and a count of the
+    blank lines after it are buffered, so memory does not grow with the input.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._partial = ""
+        self._last: Optional[str] = None
+        self._pending_blank = 0
+
+    def feed(self, chunk: str) -> List[str]:
+        if not self._started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return []
+            self._started = True
+
+        parts = (self._partial + chunk).split("\n")
+        self._partial = parts.pop()
+
+        ready = []
+        for line in parts:
+            self._push(line, ready)
+        return ready
+
+    def close(self) -> List[str]:
+        ready = self.peek()
+        self._partial = ""
+        self._last = None
+        self._pending_blank = 0
+        return ready
+
+    def peek(self) -> List[str]:
+        """Lines ``close()`` would return now, without ending the stream."""
+        ready = []
+        last = self._last
+        if self._partial.strip():
+            if last is not None:
+                ready.append(last)
+            ready.extend("" for _ in range(self._pending_blank))
+            last = self._partial
+        if last is not None:
+            ready.append(last.rstrip())
+        elif not ready:
+            ready.append("")
+        return ready
+
+    def _push(self, line: str, ready: List[str]) -> None:
+        if not line.strip():
+            self._pending_blank += 1
+            return
+        if self._last is not None:
+            ready.append(self._last)
+        ready.extend("" for _ in range(self._pending_blank))
+        self._last = line
+        self._pending_blank = 0
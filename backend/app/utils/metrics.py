@@ -0,0 +1,266 @@
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.parsers.log_parser import ParseProfile
+
+Labels = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB .. 1 GiB
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """One metric family; samples are kept per tuple of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.lock = threading.Lock()
+
+    def key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            lines.extend(self.samples())
+        return lines
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """For counters mirroring a running total kept elsewhere."""
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in self.values.items()]
+
+class GaugeMetric(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def replace(self, values: Dict[Labels, float]) -> None:
+        """Set all series at once, dropping those not given."""
+        with self.lock:
+            self.values = dict(values)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in self.values.items()]
+
+class HistogramMetric(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (count per bucket, the last one for +Inf; sum)
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.key(labels)
+        with self.lock:
+            counts, total = self.values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total[0])}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics of this process in the Prometheus text exposition format.
+
+    ``collect`` callbacks run before every render, for gauges that mirror
+    state kept elsewhere (admission, caches, sessions, jobs).
+    """
+
+    def __init__(self, prefix: str = "log_analyzer_"):
+        self.prefix = prefix
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labels: Labels = ()) -> CounterMetric:
+        return self._add(CounterMetric(self.prefix + name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Labels = ()) -> GaugeMetric:
+        return self._add(GaugeMetric(self.prefix + name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Labels = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> HistogramMetric:
+        return self._add(HistogramMetric(self.prefix + name, documentation, labels, buckets))
+
+    def _add(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self, callback: Callable[[], None]) -> None:
+        self.collectors.append(callback)
+
+    def render(self) -> str:
+        for callback in self.collectors:
+            callback()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time to respond to an HTTP request.", ("route", "method", "status"))
+REQUEST_BYTES = registry.histogram(
+    "http_request_size_bytes", "Size of HTTP request bodies.", ("route",), SIZE_BUCKETS)
+ANALYSIS_SECONDS = registry.histogram(
+    "analysis_duration_seconds", "Wall time of an analysis, by how it was requested.", ("kind",))
+ANALYSIS_LINES = registry.counter("analysis_lines_total", "Log lines analyzed.", ("kind",))
+LINES_PER_SECOND = registry.gauge(
+    "analysis_lines_per_second", "Throughput of the latest analysis of each kind.", ("kind",))
+PARSED_ENTRIES = registry.counter("parsed_entries_total", "Entries parsed, by log format.", ("format",))
+MALFORMED_ENTRIES = registry.counter(
+    "malformed_entries_total", "Entries parsed as malformed, by log format.", ("format",))
+PARSE_SECONDS = registry.counter(
+    "parse_seconds_total", "Time spent parsing, by log format; estimated from timed sample blocks.", ("format",))
+STAGE_SECONDS = registry.histogram(
+    "analysis_stage_seconds", "Time of each /analyze stage (spaCy and the analyzers after it).", ("stage",))
+
+ANALYSIS_IN_FLIGHT = registry.gauge("analysis_in_flight", "Analyses running or waiting for a worker.")
+ANALYSIS_CAPACITY = registry.gauge("analysis_capacity", "Analyses that may run or wait at once.")
+ANALYSIS_ADMITTED = registry.counter("analysis_admitted_total", "Analyses admitted.")
+ANALYSIS_REJECTED = registry.counter("analysis_rejected_total", "Analyses rejected with 429.")
+CACHE_ENTRIES = registry.gauge("result_cache_entries", "Results in the in-memory cache.")
+CACHE_HITS = registry.counter("result_cache_hits_total", "Result cache hits.", ("tier",))
+CACHE_MISSES = registry.counter("result_cache_misses_total", "Result cache misses.")
+SESSIONS = registry.gauge("sessions", "Live incremental analysis sessions.")
+JOBS = registry.gauge("jobs", "Background jobs kept, by status.", ("status",))
+
+def observe_analysis(kind: str, lines: int, seconds: float) -> None:
+    ANALYSIS_LINES.inc(lines, kind=kind)
+    ANALYSIS_SECONDS.observe(seconds, kind=kind)
+    if seconds > 0:
+        LINES_PER_SECOND.set(lines / seconds, kind=kind)
+
+def observe_log_analysis(kind: str, profile: ParseProfile, seconds: float) -> None:
+    """Record one log analysis (or session append) from its parse profile."""
+    observe_analysis(kind, profile.lines, seconds)
+    for log_format, count in profile.entries.items():
+        PARSED_ENTRIES.inc(count, format=log_format)
+    for log_format, count in profile.malformed.items():
+        MALFORMED_ENTRIES.inc(count, format=log_format)
+    for log_format, parse_seconds in profile.seconds().items():
+        PARSE_SECONDS.inc(parse_seconds, format=log_format)
+
+def observe_nlp_analysis(kind: str, text: str, stages: Dict[str, float], seconds: float) -> None:
+    observe_analysis(kind, text.count("\n") + 1, seconds)
+    for stage, stage_seconds in stages.items():
+        STAGE_SECONDS.observe(stage_seconds, stage=stage)
+
+def observe_service(admission: Dict[str, Any], cache: Dict[str, Any], sessions: Dict[str, Any],
+                    jobs: Dict[str, Any]) -> None:
+    """Mirror the ``stats()`` of the admission controller, result cache, session store and job manager."""
+    ANALYSIS_IN_FLIGHT.set(admission["inFlight"])
+    ANALYSIS_CAPACITY.set(admission["capacity"])
+    ANALYSIS_ADMITTED.set(admission["admitted"])
+    ANALYSIS_REJECTED.set(admission["rejected"])
+    CACHE_ENTRIES.set(cache["entries"])
+    CACHE_HITS.set(cache["memoryHits"], tier="memory")
+    CACHE_HITS.set(cache["diskHits"], tier="disk")
+    CACHE_MISSES.set(cache["misses"])
+    SESSIONS.set(sessions["sessions"])
+    JOBS.replace({(status,): count for status, count in jobs["byStatus"].items()})
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and counting its body bytes.
+
+    Requests are labelled with the route template (``/jobs/{job_id}``), so
+    IDs do not create a series each; unmatched paths share ``unmatched``.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        received = 0
+        status = 500
+
+        async def counting_receive() -> Dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def status_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, status_send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route=path, method=scope["method"],
+                                    status=str(status))
+            if received:
+                REQUEST_BYTES.observe(received, route=path)
@@ -0,0 +1,156 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.config import PROFILING_ENABLED, PROFILE_DIR, PROFILE_MAX_FILES
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_ID_LENGTH = 32
+
+# Raw cProfile stats: (file, line, function) -> (calls, primitive calls, own time, cumulative time, callers).
+RawStats = Dict[Tuple[str, int, str], Tuple[Any, ...]]
+
+class RawStatsSource:
+    """Raw stats in the form ``pstats.Stats`` loads from a profiler."""
+
+    def __init__(self, stats: RawStats):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+class RequestProfile:
+    """cProfile stats gathered for one request, possibly from several threads
+    and analysis processes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats: Optional[pstats.Stats] = None
+
+    def add(self, stats: RawStats) -> None:
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(RawStatsSource(stats))
+            else:
+                self.stats.add(RawStatsSource(stats))
+
+    def save(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES) -> Optional[str]:
+        """Write the stats to a new ``.prof`` file and return its id; ``None`` if nothing was profiled."""
+        with self.lock:
+            if self.stats is None:
+                return None
+            os.makedirs(directory, exist_ok=True)
+            profile_id = uuid.uuid4().hex
+            self.stats.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+        prune_profiles(directory, max_files)
+        return profile_id
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def prune_profiles(directory: str, max_files: int) -> None:
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".prof")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[max_files:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    if len(profile_id) != PROFILE_ID_LENGTH or not all(c in "0123456789abcdef" for c in profile_id):
+        return None
+    path = os.path.join(directory, f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
+
+def profile_report(path: str, sort: str = "cumulative", limit: int = 50) -> str:
+    """The ``limit`` most expensive functions of a saved profile, as pstats prints them."""
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def call_profiled(func: Callable, *args: Any) -> Tuple[Any, RawStats]:
+    """Run ``func(*args)`` under cProfile; returns its result and the raw stats.
+
+    Top-level so it can be sent to the analysis process pool.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func(*args)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+def profiling_requested() -> bool:
+    return current_profile.get() is not None
+
+@contextmanager
+def profiled() -> Iterator[None]:
+    """Profile the calling thread for the duration of the block if the current request asked for it."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.create_stats()
+        profile.add(profiler.stats)
+
+def run_profiled(func: Callable, *args: Any) -> Any:
+    """``func(*args)`` inside ``profiled``, for work handed to a thread."""
+    with profiled():
+        return func(*args)
+
+class ProfilingMiddleware:
+    """Profiles requests sent with an ``X-Profile`` header, when profiling is enabled.
+
+    The request's analysis work (in the analysis pool or on the threadpool)
+    runs under cProfile; the merged stats are saved and the response names
+    them in ``X-Profile-Id`` for ``GET /profiles/{id}``. Work done inside the
+    parse pool of parallel analyses and by background jobs is not profiled.
+    """
+
+    def __init__(self, app: Callable, enabled: bool = PROFILING_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if not self.enabled or scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_profile(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile_id = profile.save()
+                if profile_id is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_ID_HEADER.lower().encode(), profile_id.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+
+    @staticmethod
+    def _requested(scope: Dict[str, Any]) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                return value.strip().lower() not in (b"", b"0", b"false", b"no", b"off")
+        return False
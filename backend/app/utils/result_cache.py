@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+class ResultCache:
+    """Bounded LRU of analysis results keyed by a content hash.
+
+    With ``db_path`` set, results are also written to a SQLite table so they
+    survive restarts and are shared between server processes; a memory miss
+    falls back to that table and promotes the row into the LRU. Rows hold
+    the value as ``jsonable_encoder`` renders it (pydantic models as dicts),
+    which is also how the API serves it.
+    """
+
+    def __init__(self, max_entries: int, db_path: Optional[str] = None, max_disk_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self.db.commit()
+
+    @staticmethod
+    def make_key(endpoint: str, version: str, payload: str, **params: Any) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{endpoint}\0{version}\0".encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(b"\0")
+        # JSON bodies may carry lone surrogates, which plain utf-8 rejects.
+        digest.update(payload.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return self.entries[key]
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        with self.lock:
+            self._remember(key, value)
+            self.stores += 1
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(jsonable_encoder(value)), time.time()),
+                )
+                self.db.execute(
+                    "DELETE FROM results WHERE key NOT IN "
+                    "(SELECT key FROM results ORDER BY created DESC LIMIT ?)",
+                    (self.max_disk_entries,),
+                )
+                self.db.commit()
+
+    def _remember(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+                self.db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = None
+            if self.db is not None:
+                disk_entries = self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {
+                "entries": len(self.entries),
+                "maxEntries": self.max_entries,
+                "diskEntries": disk_entries,
+                "hits": hits,
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stores": self.stores,
+                "hitRate": round(hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,70 @@
+import heapq
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+class HeavyHitters:
+    """Bounded-memory frequency summary (Misra-Gries, the mergeable form of
+    Space-Saving) keeping at most ``capacity`` keys.
+
+    Counts are lower bounds: a key's true count lies in
+    ``[count, count + undercount]``, and any key seen more than ``undercount``
+    times is guaranteed to be kept. ``undercount`` never exceeds
+    ``total / (capacity + 1)``, i.e. ``error * total`` for a summary built
+    with ``for_error``. Summaries of consecutive or unrelated parts of a
+    stream merge into a summary of the whole with the same guarantee.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+        self.undercount = 0
+
+    @classmethod
+    def for_error(cls, error: float) -> "HeavyHitters":
+        """Summary whose counts are off by at most ``error`` times the total."""
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1")
+        return cls(max(1, math.ceil(1 / error) - 1))
+
+    def update(self, keys: Iterable[str]) -> None:
+        counts = Counter(keys)
+        self._add(counts, sum(counts.values()), 0)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        if other.capacity != self.capacity:
+            raise ValueError("Only summaries of the same capacity can be merged")
+        self._add(other.counts, other.total, other.undercount)
+
+    def _add(self, counts: Dict[str, int], total: int, undercount: int) -> None:
+        merged = self.counts
+        for key, count in counts.items():
+            merged[key] = merged.get(key, 0) + count
+        self.total += total
+        self.undercount += undercount
+        if len(merged) > self.capacity:
+            # Decrementing every counter by the (capacity + 1)-th largest
+            # leaves at most ``capacity`` of them positive.
+            threshold = heapq.nlargest(self.capacity + 1, merged.values())[-1]
+            self.counts = {key: count - threshold for key, count in merged.items() if count > threshold}
+            self.undercount += threshold
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def items(self) -> Iterable[Tuple[str, int]]:
+        return self.counts.items()
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        return Counter(self.counts).most_common(n)
+
+    def accuracy(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "tracked": len(self.counts),
+            "total": self.total,
+            "maxUndercount": self.undercount,
+        }
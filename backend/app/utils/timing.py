@@ -0,0 +1,21 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+class StageTimer:
+    """Accumulates wall time per named stage of a request."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def server_timing(self) -> str:
+        """Format the stages as a ``Server-Timing`` header value (milliseconds)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items())
@@ -0,0 +1,50 @@
+"""analyze_logs_structure benchmark on a large mixed-format payload.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_analyzer --lines 1000000 --compare-ref HEAD~1
+"""
+import argparse
+import json
+import time
+from typing import Dict
+
+from benchmarks.common import run_at_ref
+from benchmarks.samples import sample_corpus
+
+def build_payload(lines: int) -> str:
+    corpus = sample_corpus(lines // 4 + 1)
+    mixed = [line for group in zip(*corpus.values()) for line in group]
+    return "\n".join(mixed[:lines])
+
+def measure(lines: int) -> Dict[str, float]:
+    from app.analyzers.log_analyzer import analyze_logs_structure
+
+    payload = build_payload(lines)
+    started = time.perf_counter()
+    analyze_logs_structure(payload)
+    elapsed = time.perf_counter() - started
+    return {"lines": lines, "seconds": elapsed, "lines_per_sec": lines / elapsed}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--compare-ref", help="git revision to measure as the baseline")
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    after = measure(args.lines)
+    if args.json:
+        print(json.dumps(after))
+        return
+
+    print(f"{'':<8} {'seconds':>10} {'lines/sec':>12}")
+    if args.compare_ref:
+        before = run_at_ref(args.compare_ref, "benchmarks.bench_analyzer", ["--lines", str(args.lines)])
+        print(f"{'before':<8} {before['seconds']:>10.2f} {before['lines_per_sec']:>12,.0f}")
+    print(f"{'after':<8} {after['seconds']:>10.2f} {after['lines_per_sec']:>12,.0f}")
+    if args.compare_ref:
+        print(f"speedup: {before['seconds'] / after['seconds']:.2f}x")
+
+if __name__ == "__main__":
+    main()
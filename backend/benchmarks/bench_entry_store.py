@@ -0,0 +1,100 @@
+"""Entry store benchmark: ingest overhead, storage size and query latency.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_entry_store --lines 1000000
+
+The mixed-format payload of ``bench_analyzer`` is analyzed once without and
+once with ``store`` (into a scratch SQLite file), then a set of typical
+``/entries`` queries is timed against the stored dataset: the median of
+``--repeat`` runs, counting matches and fetching one page of 100.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from benchmarks.bench_analyzer import build_payload
+
+def measure(lines: int, repeat: int) -> Dict[str, Any]:
+    directory = tempfile.mkdtemp(prefix="bench-entry-store-")
+    path = os.path.join(directory, "entries.sqlite3")
+    os.environ["LOG_ANALYZER_ENTRY_STORE_PATH"] = path
+    from app.analyzers.entry_store import EntryStore
+    from app.analyzers.log_analyzer import analyze_logs_structure
+
+    payload = build_payload(lines)
+    started = time.perf_counter()
+    analyze_logs_structure(payload)
+    plain = time.perf_counter() - started
+
+    store = EntryStore(path)
+    dataset_id = store.create()
+    started = time.perf_counter()
+    result = analyze_logs_structure(payload, dataset_id=dataset_id)
+    stored = time.perf_counter() - started
+    store.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+
+    first = store.query(dataset_id, limit=1)["entries"][0]
+    timed = next(entry for entry in store.query(dataset_id, limit=1000)["entries"] if entry["timestamp"])
+    moment = datetime.fromisoformat(timed["timestamp"])
+    queries = {
+        "level=ERROR": {"level": "ERROR"},
+        "source": {"source": first["source"]},
+        "hour": {"hour": moment},
+        "since+until": {"since": moment, "until": moment + timedelta(minutes=10)},
+        "template": {"template": result["topErrors"][0]["message"]},
+        "level+hour": {"level": "ERROR", "hour": moment},
+        "offset=50000": {"level": "ERROR", "offset": 50_000},
+        "contains (scan)": {"contains": "timeout"},
+    }
+    timings = {}
+    for name, params in queries.items():
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            found = store.query(dataset_id, **params)
+            runs.append(time.perf_counter() - started)
+        timings[name] = {"ms": statistics.median(runs) * 1000, "total": found["total"]}
+    store.db.close()
+    shutil.rmtree(directory)
+
+    return {
+        "lines": lines,
+        "plainSeconds": plain,
+        "storedSeconds": stored,
+        "overhead": stored / plain,
+        "bytes": size,
+        "bytesPerEntry": size / result["stats"]["total"],
+        "payloadBytes": len(payload.encode()),
+        "queries": timings,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    results = measure(args.lines, args.repeat)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{results['lines']:,} lines, payload {results['payloadBytes'] / 1e6:.1f} MB")
+    print(f"analysis without store {results['plainSeconds']:.2f}s, with store {results['storedSeconds']:.2f}s "
+          f"({results['overhead']:.2f}x)")
+    print(f"store file {results['bytes'] / 1e6:.1f} MB, {results['bytesPerEntry']:.0f} bytes per entry")
+    print(f"{'query':<18} {'ms':>9} {'matches':>10}")
+    for name, timing in results["queries"].items():
+        print(f"{name:<18} {timing['ms']:>9.2f} {timing['total']:>10,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Scaling benchmark for the parallel /analyze-log mode.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_parallel --lines 1000000 --workers 1 2 4 8
+
+The pool is warmed up before timing, so the numbers exclude process start-up.
+Every parallel result is checked against the serial one.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.bench_analyzer import build_payload
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    import app.analyzers.parallel as parallel
+    parallel.PARSE_WORKERS = max(args.workers)
+    parallel.PARALLEL_MIN_BYTES = 0
+
+    payload = build_payload(args.lines)
+    pool = parallel.get_parse_pool()
+    list(pool.map(len, [""] * parallel.PARSE_WORKERS))
+
+    results = []
+    reference = None
+    for workers in args.workers:
+        started = time.perf_counter()
+        result = parallel.analyze_logs_parallel(payload, workers)
+        elapsed = time.perf_counter() - started
+
+        comparable = {key: value for key, value in result.items() if key != "entries"}
+        if reference is None:
+            reference = comparable
+        results.append({
+            "workers": workers,
+            "seconds": elapsed,
+            "lines_per_sec": args.lines / elapsed,
+            "matches_first": comparable == reference,
+        })
+    parallel.shutdown_parse_pool()
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    base = results[0]["seconds"]
+    print(f"{'workers':>7} {'seconds':>9} {'lines/sec':>12} {'speedup':>8} {'same':>5}")
+    for row in results:
+        print(f"{row['workers']:>7} {row['seconds']:>9.2f} {row['lines_per_sec']:>12,.0f} "
+              f"{base / row['seconds']:>7.2f}x {str(row['matches_first']):>5}")
+
+if __name__ == "__main__":
+    main()
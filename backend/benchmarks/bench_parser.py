@@ -0,0 +1,71 @@
+"""Parser throughput benchmark.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_parser --lines 20000 --compare-ref HEAD~1
+
+Besides one stream per format, ``corrupted`` times lines without a usable
+timestamp, i.e. the parser's fallback path, and ``json-nested`` JSON lines
+with a few KB of nested context after the mapped fields. Set
+``LOG_ANALYZER_JSON_PROJECTION_MIN_CHARS`` to time the latter with
+projection enabled.
+
+``--compare-ref`` extracts ``backend/app`` at the given git revision into a
+temporary directory and measures it with the same samples, so the output
+shows lines/sec before and after a change.
+"""
+import argparse
+import json
+import time
+from typing import Dict
+
+from benchmarks.common import run_at_ref
+from benchmarks.samples import corrupted_lines, nested_json_lines, sample_corpus
+
+def measure(lines_per_format: int, repeat: int) -> Dict[str, float]:
+    from app.parsers.log_parser import parse_log_line
+
+    streams = sample_corpus(lines_per_format)
+    streams["corrupted"] = corrupted_lines(lines_per_format)
+    streams["json-nested"] = nested_json_lines(lines_per_format)
+
+    results = {}
+    for log_format, lines in streams.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for line in lines:
+                parse_log_line(line)
+            best = min(best, time.perf_counter() - started)
+        results[log_format] = len(lines) / best
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20_000, help="lines per format")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare-ref", help="git revision to measure as the baseline")
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    after = measure(args.lines, args.repeat)
+    if args.json:
+        print(json.dumps(after))
+        return
+
+    before = None
+    if args.compare_ref:
+        before = run_at_ref(
+            args.compare_ref, "benchmarks.bench_parser",
+            ["--lines", str(args.lines), "--repeat", str(args.repeat)],
+        )
+
+    print(f"{'format':<12} {'before l/s':>12} {'after l/s':>12} {'speedup':>8}")
+    for log_format, rate in after.items():
+        if before:
+            print(f"{log_format:<12} {before[log_format]:>12,.0f} {rate:>12,.0f} {rate / before[log_format]:>7.2f}x")
+        else:
+            print(f"{log_format:<12} {'-':>12} {rate:>12,.0f} {'-':>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Cold-start benchmark: time to ``import main`` in a fresh interpreter.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_startup --runs 5 --compare-ref HEAD~1
+
+Warm-up and preloading are disabled so only the import itself is measured.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from benchmarks.common import run_at_ref
+
+def measure(runs: int) -> Dict[str, float]:
+    env = dict(os.environ, LOG_ANALYZER_NLP_WARMUP="0", LOG_ANALYZER_NLP_PRELOAD="0")
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import main"],
+            cwd=os.getcwd(), env=env, check=True, capture_output=True,
+        )
+        timings.append(time.perf_counter() - started)
+    return {"median_seconds": statistics.median(timings), "min_seconds": min(timings)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare-ref", help="git revision to measure as the baseline")
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    after = measure(args.runs)
+    if args.json:
+        print(json.dumps(after))
+        return
+
+    print(f"{'':<8} {'median s':>9} {'min s':>9}")
+    if args.compare_ref:
+        before = run_at_ref(args.compare_ref, "benchmarks.bench_startup", ["--runs", str(args.runs)])
+        print(f"{'before':<8} {before['median_seconds']:>9.3f} {before['min_seconds']:>9.3f}")
+    print(f"{'after':<8} {after['median_seconds']:>9.3f} {after['min_seconds']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
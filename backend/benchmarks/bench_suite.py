@@ -0,0 +1,209 @@
+"""Benchmark suite: log and NLP analysis at 10K/1M/10M lines, with baseline regression checks.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --scenarios log-10k log-1m --baseline results.json
+
+Input comes from ``LogGenerator``: a deterministic mix of apache combined,
+syslog, JSON and both application layouts, with ``--corruption`` and
+``--cardinality`` controlling broken lines and distinct values. Every
+scenario runs in a fresh process, so its peak RSS is its own.
+
+``log-*`` scenarios feed the text to ``LogStructureAccumulator`` in chunks,
+as ``/analyze-log/upload`` does, so 10M lines never sit in memory at once;
+their stages are ``parse`` (the feed, split per format from the parse
+profile) and ``result``. ``nlp-*`` scenarios run ``perform_nlp_analysis``
+on the whole text with spaCy in-process, as in the analysis pool, and
+report its stages; spaCy sees a sample of ``LOG_ANALYZER_NLP_SAMPLE_CHARS``
+and stops at ``LOG_ANALYZER_NLP_TIME_BUDGET``.
+Generating the input is never timed, and scenarios shorter than
+``MIN_MEASURED_SECONDS`` are repeated; the fastest run counts.
+
+``--baseline`` compares lines/sec and peak RSS with a stored ``--output``
+file and exits with status 1 if any scenario is worse by more than
+``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import BACKEND_DIR
+from benchmarks.samples import LogGenerator
+
+SUITE_VERSION = 1
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+SCENARIOS = {f"{analysis}-{size}": (analysis, lines) for analysis in ("log", "nlp") for size, lines in SIZES.items()}
+# nlp-10m needs the whole 1.2 GB text in memory; run it by name.
+DEFAULT_SCENARIOS = [name for name in SCENARIOS if name != "nlp-10m"]
+GENERATOR_OPTIONS = ("seed", "corruption", "cardinality")
+# Short scenarios are repeated until they have been timed for this long.
+MIN_MEASURED_SECONDS = 2.0
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_log(lines: int, generator: LogGenerator) -> Dict[str, Any]:
+    from app.analyzers.log_analyzer import LogStructureAccumulator
+
+    accumulator = LogStructureAccumulator()
+    feed_seconds = 0.0
+    payload_chars = 0
+    for chunk in generator.chunks(lines):
+        payload_chars += len(chunk)
+        started = time.perf_counter()
+        accumulator.feed(chunk)
+        feed_seconds += time.perf_counter() - started
+    started = time.perf_counter()
+    accumulator.close()
+    feed_seconds += time.perf_counter() - started
+    started = time.perf_counter()
+    result = accumulator.result()
+    result_seconds = time.perf_counter() - started
+
+    stages = {"parse": feed_seconds, "result": result_seconds}
+    stages.update({f"parse.{log_format}": seconds for log_format, seconds in accumulator.profile.seconds().items()})
+    return {
+        "seconds": feed_seconds + result_seconds,
+        "payloadChars": payload_chars,
+        "stages": stages,
+        "malformed": result["stats"]["malformed"],
+        "corruptedLines": result["stats"]["corrupted_lines"],
+    }
+
+def run_nlp(lines: int, generator: LogGenerator) -> Dict[str, Any]:
+    from app.analyzers.executor import init_worker, nlp_analysis_job
+
+    init_worker()
+    text = "\n".join(generator.lines(lines))
+    started = time.perf_counter()
+    _, stages = nlp_analysis_job(text)
+    return {"seconds": time.perf_counter() - started, "payloadChars": len(text), "stages": stages}
+
+RUNNERS = {"log": run_log, "nlp": run_nlp}
+
+def run_scenario(name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """One scenario in this process; the best of at least ``repeat`` runs."""
+    analysis, lines = SCENARIOS[name]
+    best = None
+    runs = 0
+    measured = 0.0
+    while runs < options["repeat"] or measured < MIN_MEASURED_SECONDS:
+        generator = LogGenerator(options["seed"], options["corruption"], options["cardinality"])
+        run = RUNNERS[analysis](lines, generator)
+        runs += 1
+        measured += run["seconds"]
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    best["runs"] = runs
+    best["lines"] = lines
+    best["linesPerSecond"] = lines / best["seconds"]
+    best["peakRssBytes"] = peak_rss_bytes()
+    return best
+
+def run_isolated(name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    args = [sys.executable, "-m", "benchmarks.bench_suite", "--run-scenario", name,
+            "--repeat", str(options["repeat"])]
+    for option in GENERATOR_OPTIONS:
+        args += [f"--{option}", str(options[option])]
+    output = subprocess.run(args, cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Per scenario found in both: the relative change of throughput and
+    memory, and whether either is worse than ``threshold``."""
+    if results["options"] != baseline["options"]:
+        raise SystemExit(f"The baseline was recorded with other generator options: {baseline['options']}")
+    rows = []
+    for name, after in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        speed = after["linesPerSecond"] / before["linesPerSecond"] - 1
+        memory = after["peakRssBytes"] / before["peakRssBytes"] - 1
+        rows.append({
+            "scenario": name,
+            "linesPerSecond": speed,
+            "peakRss": memory,
+            "regressed": speed < -threshold or memory > threshold,
+        })
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per scenario, more for short ones; the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corruption", type=float, default=0.02, help="share of broken lines")
+    parser.add_argument("--cardinality", type=int, default=10_000, help="distinct values per variable field")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fail if lines/sec drops or peak RSS grows by more than this fraction")
+    parser.add_argument("--run-scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+    options = {"repeat": args.repeat, **{option: getattr(args, option) for option in GENERATOR_OPTIONS}}
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario, options)))
+        return
+
+    results = {
+        "suiteVersion": SUITE_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "options": {option: options[option] for option in GENERATOR_OPTIONS},
+        "scenarios": {},
+    }
+    for name in args.scenarios:
+        results["scenarios"][name] = run_isolated(name, options)
+        if not args.json:
+            scenario = results["scenarios"][name]
+            print(f"{name:<10} {scenario['lines']:>11,} lines {scenario['seconds']:>9.2f}s "
+                  f"{scenario['linesPerSecond']:>12,.0f} lines/s {scenario['peakRssBytes'] / 2**20:>8.0f} MiB peak",
+                  flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    rows = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.threshold)
+    if args.json:
+        print(json.dumps({**results, "comparison": rows} if args.baseline else results))
+    else:
+        if results["scenarios"]:
+            print("\nstages (seconds)")
+        for name, scenario in results["scenarios"].items():
+            print(f"{name:<10} " + ", ".join(f"{stage} {seconds:.3f}" for stage, seconds in scenario["stages"].items()))
+        if rows:
+            print(f"\n{'scenario':<10} {'lines/s':>9} {'peak RSS':>9}")
+        for row in rows:
+            print(f"{row['scenario']:<10} {row['linesPerSecond']:>+9.1%} {row['peakRss']:>+9.1%}"
+                  f"{'  REGRESSION' if row['regressed'] else ''}")
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
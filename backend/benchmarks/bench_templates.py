@@ -0,0 +1,118 @@
+"""Error grouping benchmark: prefix/digit-regex grouping vs the Drain-style template miner.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_templates --lines 1000000
+
+Error messages are drawn from a fixed set of event types, each with
+variable IDs, durations, hex values, paths and user names. For every
+method the output lists lines/sec, the number of groups produced, and
+purity: the share of lines whose group's most common event type is their
+own. One event type split over several groups lowers nothing but inflates
+the group count, while unrelated events merged into one group lower the
+purity.
+
+``prefix`` is the old top-errors key (``msg[:100]``); ``digits`` is the old
+repeated-pattern key (digits replaced by ``N``, first 50 characters);
+``templates`` masks and counts messages and mines the distinct ones, as
+the analyzers now do; ``online`` adds every masked message to the miner
+one by one.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from app.analyzers.templates import TemplateMiner, group_by_template, mask_variables
+
+USERS = ["alice", "bob", "carol", "dave", "erin", "mallory", "trent", "victor"]
+EVENTS = [
+    lambda rng: f"Connection timeout after {rng.randint(1, 30000)} ms to db-{rng.randint(1, 40)}.internal",
+    lambda rng: f"Database query failed: deadlock detected on table orders_{rng.randint(1, 500)}",
+    lambda rng: f"User {rng.choice(USERS)} failed to authenticate from 10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+    lambda rng: f"Request {rng.getrandbits(64):016x} to /api/v1/items/{rng.randint(1, 99999)} returned 500",
+    lambda rng: f"Worker {rng.randint(1, 64)} crashed with exit code {rng.choice([1, 2, 137, 139])}",
+    lambda rng: f"Cache miss for key session:{rng.getrandbits(48):x} in region eu-{rng.randint(1, 3)}",
+    lambda rng: f"Failed to write /var/lib/app/chunk-{rng.randint(1, 10**6)}.bin: No space left on device",
+    lambda rng: f"Payment {rng.randint(10**8, 10**9)} declined for user {rng.choice(USERS)} reason insufficient funds",
+    lambda rng: f"TLS handshake with {rng.choice(['api', 'auth', 'billing'])}.example.com failed: certificate expired",
+    lambda rng: f"Job {rng.randint(1, 9999)} exceeded memory limit of {rng.choice([256, 512, 1024])} MB",
+]
+DIGITS_PATTERN = re.compile(r"\d+")
+
+def error_messages(count: int, seed: int = 0) -> Tuple[List[str], List[int]]:
+    rng = random.Random(seed)
+    kinds = [rng.randrange(len(EVENTS)) for _ in range(count)]
+    return [EVENTS[kind](rng) for kind in kinds], kinds
+
+def prefix_groups(messages: List[str]) -> List[str]:
+    return [message[:100] for message in messages]
+
+def digit_groups(messages: List[str]) -> List[str]:
+    return [DIGITS_PATTERN.sub("N", message.lower())[:50] for message in messages]
+
+def template_groups(messages: List[str]) -> List[int]:
+    """Template id of every message, via counting and mining the distinct masked ones."""
+    masked = mask_variables(messages)
+    miner = TemplateMiner()
+    group_by_template(Counter(masked), miner)
+    # Mining is done; look the distinct messages up again to label every line.
+    ids = {message: miner.add(message, 0).template_id for message in dict.fromkeys(masked)}
+    return [ids[message] for message in masked]
+
+def online_groups(messages: List[str]) -> List[int]:
+    miner = TemplateMiner()
+    groups = []
+    for start in range(0, len(messages), 4096):
+        for message in mask_variables(messages[start:start + 4096]):
+            groups.append(miner.add(message).template_id)
+    return groups
+
+def purity(groups: List, kinds: List[int]) -> float:
+    members: Dict = defaultdict(Counter)
+    for group, kind in zip(groups, kinds):
+        members[group][kind] += 1
+    return sum(counts.most_common(1)[0][1] for counts in members.values()) / len(kinds)
+
+METHODS: Dict[str, Callable[[List[str]], List]] = {
+    "prefix": prefix_groups,
+    "digits": digit_groups,
+    "templates": template_groups,
+    "online": online_groups,
+}
+
+def measure(lines: int) -> Dict[str, Dict[str, float]]:
+    messages, kinds = error_messages(lines)
+    results = {}
+    for name, method in METHODS.items():
+        started = time.perf_counter()
+        groups = method(messages)
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "linesPerSecond": lines / elapsed,
+            "groups": len(set(groups)),
+            "purity": purity(groups, kinds),
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    results = measure(args.lines)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{len(EVENTS)} event types, {args.lines:,} error lines")
+    print(f"{'method':<10} {'lines/s':>12} {'groups':>10} {'purity':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['linesPerSecond']:>12,.0f} {result['groups']:>10,} {result['purity']:>8.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Time-series benchmark: RateHistogram ingest and the timeSeries section on large inputs.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_time_series --entries 10000000
+
+Entries are generated as a day of traffic (a handful per second, with an
+error burst), sharing one datetime per second as the memoized timestamp
+parsers do. ``ingest`` is what the analysis adds per block while parsing;
+``series`` is everything that runs after parsing: the final fold, the
+per-level bincount and the rolling median/MAD detection. ``dict`` counts the
+same epochs per second and level in a Python dict for comparison.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.analyzers.time_series import RateHistogram, build_time_series, moment_epochs
+
+BLOCK_SIZE = 4096
+
+def generate(entries: int, seed: int = 0) -> Tuple[List[datetime], List[int]]:
+    rng = random.Random(seed)
+    seconds = 86_400
+    start = datetime(2024, 3, 1)
+    moments = [start + timedelta(seconds=i) for i in range(seconds)]
+    per_second = entries / seconds
+    times, levels = [], []
+    for i in range(entries):
+        second = min(int(i / per_second), seconds - 1)
+        times.append(moments[second])
+        burst = 40_000 <= second < 40_300
+        levels.append(0 if burst or rng.random() < 0.03 else rng.randrange(1, 4))
+    return times, levels
+
+def measure(entries: int) -> Dict[str, Any]:
+    times, levels = generate(entries)
+    results: Dict[str, Any] = {"entries": entries}
+
+    started = time.perf_counter()
+    histogram = RateHistogram()
+    for start in range(0, entries, BLOCK_SIZE):
+        histogram.add(times[start:start + BLOCK_SIZE], levels[start:start + BLOCK_SIZE])
+    results["ingestSeconds"] = time.perf_counter() - started
+
+    for resolution in (1, 60):
+        started = time.perf_counter()
+        section = build_time_series(histogram, resolution)
+        results[f"seriesSeconds@{resolution}"] = time.perf_counter() - started
+        results[f"buckets@{resolution}"] = len(section["total"])
+        results[f"anomalies@{resolution}"] = len(section["anomalies"])
+
+    started = time.perf_counter()
+    counts: Dict[Tuple[int, int], int] = {}
+    for start in range(0, entries, BLOCK_SIZE):
+        for key in zip(moment_epochs(times[start:start + BLOCK_SIZE]), levels[start:start + BLOCK_SIZE]):
+            counts[key] = counts.get(key, 0) + 1
+    results["dictSeconds"] = time.perf_counter() - started
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10_000_000)
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    results = measure(args.entries)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{results['entries']:,} entries")
+    print(f"ingest while parsing  {results['ingestSeconds']:.2f}s "
+          f"({results['ingestSeconds'] / results['entries'] * 1e9:.0f} ns/entry)")
+    for resolution in (1, 60):
+        print(f"series at {resolution:>2}s         {results[f'seriesSeconds@{resolution}'] * 1000:.1f} ms, "
+              f"{results[f'buckets@{resolution}']:,} buckets, {results[f'anomalies@{resolution}']} anomalies")
+    print(f"dict counting         {results['dictSeconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
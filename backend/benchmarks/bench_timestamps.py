@@ -0,0 +1,121 @@
+"""Timestamp parsing microbenchmark: strptime/fromisoformat vs app.utils.log_utils.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.bench_timestamps --count 100000
+
+Two streams per layout are timed: ``sequential`` advances the clock by a
+fraction of a second per line like a real log (so seconds repeat and the
+memo hits), ``random`` draws every timestamp independently. The reference
+functions are the strptime-based helpers the parser used before, followed by
+the ``fromisoformat`` call the time analysis made to get the hour; the fast
+side parses once and reads the hour, leaving ``isoformat`` to the few entries
+that are returned.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+def reference_apache(value: str) -> int:
+    try:
+        timestamp = datetime.strptime(value, "%d/%b/%Y:%H:%M:%S %z").isoformat()
+    except Exception:
+        timestamp = datetime.utcnow().isoformat()
+    return datetime.fromisoformat(timestamp).hour
+
+def reference_syslog(value: str) -> int:
+    try:
+        current_year = datetime.now().year
+        timestamp = datetime.strptime(f"{current_year} {value}", "%Y %b %d %H:%M:%S").isoformat()
+    except Exception:
+        timestamp = datetime.utcnow().isoformat()
+    return datetime.fromisoformat(timestamp).hour
+
+def reference_iso(value: str) -> int:
+    try:
+        timestamp = datetime.fromisoformat(value).isoformat()
+    except Exception:
+        try:
+            timestamp = datetime.strptime(value, "%Y-%m-%d %H:%M:%S").isoformat()
+        except Exception:
+            timestamp = datetime.utcnow().isoformat()
+    return datetime.fromisoformat(timestamp).hour
+
+LAYOUTS = {
+    "apache": lambda dt: dt.strftime("%d/%b/%Y:%H:%M:%S +0000"),
+    "syslog": lambda dt: dt.strftime("%b %d %H:%M:%S"),
+    "iso": lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z",
+}
+
+def timestamps(layout: str, count: int, sequential: bool, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    start = datetime(2024, 3, 1)
+    current = start
+    values = []
+    for _ in range(count):
+        if sequential:
+            current += timedelta(milliseconds=rng.randint(0, 400))
+        else:
+            current = start + timedelta(seconds=rng.randint(0, 90 * 86400), milliseconds=rng.randint(0, 999))
+        values.append(LAYOUTS[layout](current))
+    return values
+
+def best_rate(func: Callable[[str], object], values: List[str], repeat: int,
+              reset: Callable[[], None] = lambda: None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        reset()
+        started = time.perf_counter()
+        for value in values:
+            func(value)
+        best = min(best, time.perf_counter() - started)
+    return len(values) / best
+
+def measure(count: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    from app.utils import log_utils
+
+    fast = {
+        "apache": lambda value: log_utils.apache_timestamp(value).hour,
+        "syslog": lambda value: log_utils.syslog_timestamp(value).hour,
+        "iso": lambda value: log_utils.iso_timestamp(value).hour,
+    }
+    reference = {"apache": reference_apache, "syslog": reference_syslog, "iso": reference_iso}
+
+    def clear_memos() -> None:
+        log_utils._parse_apache.cache_clear()
+        log_utils._parse_syslog.cache_clear()
+
+    results = {}
+    for layout in LAYOUTS:
+        for sequential in (True, False):
+            values = timestamps(layout, count, sequential)
+            for value in values[:1000]:
+                assert fast[layout](value) == reference[layout](value), value
+            name = f"{layout}/{'sequential' if sequential else 'random'}"
+            results[name] = {
+                "strptime": best_rate(reference[layout], values, repeat),
+                "fast": best_rate(fast[layout], values, repeat, clear_memos),
+            }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="timestamps per stream")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print raw JSON only")
+    args = parser.parse_args()
+
+    results = measure(args.count, args.repeat)
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{'stream':<20} {'strptime ts/s':>14} {'fast ts/s':>14} {'speedup':>8}")
+    for name, rates in results.items():
+        print(f"{name:<20} {rates['strptime']:>14,.0f} {rates['fast']:>14,.0f} {rates['fast'] / rates['strptime']:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
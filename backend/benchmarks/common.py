@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from typing import Any, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_at_ref(ref: str, module: str, args: List[str]) -> Any:
+    """Run ``python -m <module> <args> --json`` against ``app`` as of ``ref``.
+
+    ``backend/app`` and ``backend/main.py`` are extracted from git into a
+    temporary directory that shadows the working tree, while the benchmark code itself comes from the
+    working tree. The last line of output is parsed as JSON.
+    """
+    archive = subprocess.run(
+        ["git", "archive", ref, "app", "main.py"],
+        cwd=BACKEND_DIR, check=True, capture_output=True,
+    ).stdout
+    with tempfile.TemporaryDirectory() as tmp:
+        with tarfile.open(fileobj=BytesIO(archive)) as tar:
+            tar.extractall(tmp)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmp, BACKEND_DIR]))
+        output = subprocess.run(
+            [sys.executable, "-m", module, *args, "--json"],
+            cwd=tmp, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
@@ -0,0 +1,210 @@
+import json
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+LEVELS = ["ERROR", "WARN", "INFO", "DEBUG"]
+MESSAGES = [
+    "User {n} logged in successfully",
+    "Connection timeout after {n} ms",
+    "Database query failed: deadlock detected on table orders_{n}",
+    "Cache miss for key session:{n}",
+    "Request /api/v1/items/{n} completed",
+    "Worker {n} started",
+]
+
+def _message(rng: random.Random) -> str:
+    return rng.choice(MESSAGES).format(n=rng.randint(1, 10_000))
+
+def _ip(rng: random.Random) -> str:
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+def apache_line(rng: random.Random) -> str:
+    status = rng.choice([200, 200, 200, 301, 404, 500])
+    return (
+        f'{_ip(rng)} - - [{rng.randint(1, 28):02d}/{rng.choice(MONTHS)}/2024:'
+        f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} +0000] '
+        f'"GET /api/v1/items/{rng.randint(1, 500)} HTTP/1.1" {status} {rng.randint(100, 9999)} '
+        f'"-" "Mozilla/5.0"'
+    )
+
+def syslog_line(rng: random.Random) -> str:
+    return (
+        f"{rng.choice(MONTHS)} {rng.randint(1, 28):2d} "
+        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} "
+        f"host{rng.randint(1, 5)} sshd[{rng.randint(100, 9999)}]: {_message(rng)}"
+    )
+
+def json_line(rng: random.Random) -> str:
+    return json.dumps({
+        "timestamp": f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z",
+        "level": rng.choice(LEVELS).lower(),
+        "message": _message(rng),
+        "service": rng.choice(["api", "billing", "auth"]),
+    })
+
+def nested_json_line(rng: random.Random) -> str:
+    """A JSON line whose mapped fields are followed by a large nested payload."""
+    return json.dumps({
+        "timestamp": f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z",
+        "level": rng.choice(LEVELS).lower(),
+        "message": _message(rng),
+        "source": rng.choice(["api", "billing", "auth"]),
+        "context": {
+            "request": {"headers": {f"x-header-{i}": f"value-{rng.randint(1, 10_000)}" for i in range(20)}},
+            "items": [{"id": rng.randint(1, 10_000), "price": rng.random() * 100, "tags": ["a", "b"]} for _ in range(30)],
+            "trace": [f"at module{i}.function ({_message(rng)})" for i in range(10)],
+        },
+    })
+
+def application_line(rng: random.Random) -> str:
+    timestamp = f"2024-03-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    if rng.random() < 0.5:
+        return f"{timestamp.replace(' ', 'T')}.123Z [{rng.choice(LEVELS)}] {_message(rng)}"
+    return f"{rng.choice(LEVELS)} {timestamp} {_message(rng)}"
+
+def corrupted_line(rng: random.Random) -> str:
+    """A line whose timestamp is missing or unusable, or that is not a log line at all."""
+    return rng.choice([
+        lambda: f"[{rng.choice(LEVELS)}] {_message(rng)}",
+        lambda: f"2024-13-{rng.randint(32, 99)} 25:61:00 [ERROR] {_message(rng)}",
+        lambda: json.dumps({"level": rng.choice(LEVELS).lower(), "message": _message(rng)}),
+        lambda: f'{_ip(rng)} - - [99/Foo/2024:00:00:00 +0000] "GET / HTTP/1.1" 500 12 "-" "-"',
+        lambda: f"Stack frame {rng.randint(1, 99)}: at module.function ({_message(rng)})",
+    ])()
+
+GENERATORS = {
+    "apache": apache_line,
+    "syslog": syslog_line,
+    "json": json_line,
+    "application": application_line,
+}
+
+def sample_lines(log_format: str, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    generator = GENERATORS[log_format]
+    return [generator(rng) for _ in range(count)]
+
+def nested_json_lines(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [nested_json_line(rng) for _ in range(count)]
+
+def corrupted_lines(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [corrupted_line(rng) for _ in range(count)]
+
+def sample_corpus(count: int, seed: int = 0) -> Dict[str, List[str]]:
+    return {log_format: sample_lines(log_format, count, seed) for log_format in GENERATORS}
+
+# Formats of ``LogGenerator``: every layout the parsers have a pattern for.
+MIXED_FORMATS = ("apache", "syslog", "json", "application-bracketed", "application-leading")
+LEVEL_WEIGHTS = {"ERROR": 5, "WARN": 10, "INFO": 70, "DEBUG": 15}
+STATUS_WEIGHTS = {200: 80, 301: 5, 404: 10, 500: 5}
+
+class LogGenerator:
+    """Deterministic stream of mixed-format log lines.
+
+    ``formats`` weighs the ``MIXED_FORMATS`` against each other (all equal
+    by default). ``cardinality`` is the number of distinct values each
+    variable field (IPs, hosts, services, request paths, IDs in messages)
+    draws from, so it sets how many distinct errors, IPs and keywords the
+    analyzers track. ``corruption`` is the share of lines that are broken:
+    half are cut off at a random point, half replaced by ``corrupted_line``.
+    Timestamps start at ``START`` and advance one second every
+    ``lines_per_second`` lines. The same arguments always give the same lines.
+    """
+
+    START = datetime(2024, 3, 1)
+
+    def __init__(self, seed: int = 0, corruption: float = 0.0, cardinality: int = 10_000,
+                 formats: Optional[Dict[str, float]] = None, lines_per_second: int = 100):
+        self.rng = random.Random(seed)
+        self.corruption = corruption
+        self.cardinality = max(cardinality, 1)
+        weights = formats or {log_format: 1 for log_format in MIXED_FORMATS}
+        self.formats = [getattr(self, "_" + log_format.replace("-", "_")) for log_format in weights]
+        self.format_weights = list(accumulate(weights.values()))
+        self.levels = list(LEVEL_WEIGHTS)
+        self.level_weights = list(accumulate(LEVEL_WEIGHTS.values()))
+        self.statuses = list(STATUS_WEIGHTS)
+        self.status_weights = list(accumulate(STATUS_WEIGHTS.values()))
+        self.lines_per_second = lines_per_second
+        self.index = 0
+        self.second = -1
+        self.times: Dict[str, str] = {}
+
+    def lines(self, count: int) -> List[str]:
+        return [self.line() for _ in range(count)]
+
+    def chunks(self, total: int, lines_per_chunk: int = 100_000) -> Iterator[str]:
+        """``total`` lines as newline-terminated text chunks."""
+        while total > 0:
+            count = min(total, lines_per_chunk)
+            yield "\n".join(self.lines(count)) + "\n"
+            total -= count
+
+    def line(self) -> str:
+        rng = self.rng
+        second = self.index // self.lines_per_second
+        self.index += 1
+        if second != self.second:
+            self._set_time(second)
+        generate = self.formats[bisect(self.format_weights, rng.random() * self.format_weights[-1])]
+        if self.corruption and rng.random() < self.corruption:
+            if rng.random() < 0.5:
+                line = generate()
+                return line[:rng.randrange(1, len(line))]
+            return corrupted_line(rng)
+        return generate()
+
+    def _set_time(self, second: int) -> None:
+        moment = self.START + timedelta(seconds=second)
+        self.second = second
+        self.times = {
+            "apache": moment.strftime("%d/%b/%Y:%H:%M:%S +0000"),
+            "syslog": f"{MONTHS[moment.month - 1]} {moment.day:2d} {moment:%H:%M:%S}",
+            "iso": moment.strftime("%Y-%m-%dT%H:%M:%S"),
+            "spaced": moment.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def _value(self) -> int:
+        return self.rng.randrange(self.cardinality)
+
+    def _level(self) -> str:
+        return self.levels[bisect(self.level_weights, self.rng.random() * self.level_weights[-1])]
+
+    def _message(self) -> str:
+        return self.rng.choice(MESSAGES).format(n=self._value())
+
+    def _ip(self) -> str:
+        n = self._value()
+        return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+    def _apache(self) -> str:
+        status = self.statuses[bisect(self.status_weights, self.rng.random() * self.status_weights[-1])]
+        return (
+            f'{self._ip()} - - [{self.times["apache"]}] "GET /api/v1/items/{self._value()} HTTP/1.1" '
+            f'{status} {self.rng.randint(100, 9999)} "https://example.com/p/{self._value()}" "Mozilla/5.0"'
+        )
+
+    def _syslog(self) -> str:
+        return f"{self.times['syslog']} host{self._value()} sshd[{self.rng.randint(100, 9999)}]: {self._message()}"
+
+    def _json(self) -> str:
+        return json.dumps({
+            "timestamp": self.times["iso"] + "Z",
+            "level": self._level().lower(),
+            "message": self._message(),
+            "service": f"service-{self._value()}",
+        })
+
+    def _application_bracketed(self) -> str:
+        if self.rng.random() < 0.5:
+            return f"{self.times['iso']}.123Z [{self._level()}] {self._message()}"
+        return f"{self.times['spaced']} [{self._level()}] {self._message()}"
+
+    def _application_leading(self) -> str:
+        return f"{self._level()} {self.times['spaced']} {self._message()}"
@@ -1,13 +1,63 @@
-from fastapi import FastAPI
+import codecs
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from typing import Literal, Optional
 from datetime import datetime
 
 from app.models.schemas import LogRequest, LogData
-from app.analyzers.nlp_analyzer import perform_nlp_analysis
-from app.analyzers.log_analyzer import analyze_logs_structure
+from app.models.entry import LEVELS
+from app.analyzers.log_analyzer import LogStructureAccumulator
+from app.analyzers.executor import (
+    run_analysis, admitted, admission, shutdown_analysis_pool,
+    nlp_analysis_job, log_analysis_job, AnalysisTimeout, AnalysisUnavailable,
+)
+from app.analyzers.sessions import AnalysisSession, SessionStore
+from app.analyzers.jobs import (
+    Job, JobManager, log_job_runner, nlp_job_runner, text_chunks, file_chunks, copy_text_file, remove_file,
+    JOB_DONE, FINISHED_STATES,
+)
+from app.analyzers.parallel import analyze_logs_parallel, shutdown_parse_pool
+from app.analyzers.entry_store import EntryStore, EntryWriter
+from app.parsers.json_fields import DEFAULT_JSON_PROFILE, json_profiles
+from app.parsers.log_parser import ParseProfile
+from app.analyzers.nlp_pipeline import (
+    shutdown_nlp_pool, warm_up_in_background, model_status, model_installed,
+    MODEL_NAME, MODEL_LOADING,
+)
+from app.config import (
+    NLP_WARMUP, ANALYZER_VERSION, RESULT_CACHE_SIZE, RESULT_CACHE_PATH, RESULT_CACHE_DISK_SIZE, SKETCH_ERROR,
+    TIME_SERIES_RESOLUTION, NLP_SAMPLE_CHARS,
+)
+from app.utils.timing import StageTimer
+from app.utils.result_cache import ResultCache
+from app.utils.admission import Overloaded
+from app.utils.metrics import (
+    MetricsMiddleware, registry, observe_log_analysis, observe_nlp_analysis, observe_service,
+)
+from app.utils.profiling import (
+    ProfilingMiddleware, PROFILE_ID_HEADER, profiled, profiling_requested, run_profiled, profile_path,
+    profile_report,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if NLP_WARMUP:
+        warm_up_in_background()
+    job_manager.start()
+    yield
+    job_manager.stop()
+    session_store.clear()
+    shutdown_analysis_pool()
+    shutdown_parse_pool()
+    shutdown_nlp_pool()
 
-app = FastAPI(title="Log Analyzer API", version="1.0.0")
+app = FastAPI(title="Log Analyzer API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,20 +65,91 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Cache", "Retry-After", PROFILE_ID_HEADER],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Сервер перевантажено, повторіть запит пізніше"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(AnalysisTimeout)
+async def timeout_handler(request: Request, exc: AnalysisTimeout):
+    return JSONResponse(status_code=504, content={"detail": "Аналіз перевищив ліміт часу"})
+
+@app.exception_handler(AnalysisUnavailable)
+async def unavailable_handler(request: Request, exc: AnalysisUnavailable):
+    return JSONResponse(status_code=503, content={"detail": "Процес аналізу аварійно завершився, повторіть запит"})
 
 latest_analysis: Optional[dict] = None
 last_analysis_time: Optional[str] = None
 latest_log_analysis: Optional[dict] = None
 last_log_analysis_time: Optional[str] = None
+# Set while the latest log analysis is a session; its result is read on demand.
+latest_log_session: Optional[AnalysisSession] = None
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# See the MISSING_TIMESTAMPS_* modes in app.analyzers.log_analyzer.
+MissingTimestamps = Literal["skip", "inherit"]
+Level = Literal[LEVELS]
+ProfileSort = Literal["cumulative", "tottime", "calls"]
+
+def json_profile_param(json_profile: str = Query(DEFAULT_JSON_PROFILE)) -> str:
+    if json_profile not in json_profiles:
+        raise HTTPException(status_code=400, detail=f"Невідомий профіль JSON-полів: {json_profile}")
+    return json_profile
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_PATH, RESULT_CACHE_DISK_SIZE)
+session_store = SessionStore()
+entry_store = EntryStore()
+
+def record_job_result(job: Job) -> None:
+    global latest_analysis, last_analysis_time, latest_log_analysis, latest_log_session, last_log_analysis_time
+
+    if job.kind == "analyze":
+        latest_analysis = job.result
+        last_analysis_time = datetime.utcnow().isoformat()
+    else:
+        latest_log_analysis = job.result
+        latest_log_session = None
+        last_log_analysis_time = datetime.utcnow().isoformat()
+
+job_manager = JobManager(on_done=record_job_result)
+
+def collect_service_metrics() -> None:
+    observe_service(admission.stats(), result_cache.stats(), session_store.stats(), job_manager.stats())
+
+registry.collect(collect_service_metrics)
 
 @app.get("/")
 def read_root():
     return {"message": "Log Analyzer API", "version": "1.0.0"}
 
+@app.get("/ready")
+def readiness(response: Response):
+    nlp_model = model_status()
+    if nlp_model["state"] == MODEL_LOADING:
+        response.status_code = 503
+    return {
+        "status": "loading" if nlp_model["state"] == MODEL_LOADING else "ready",
+        "nlpModel": nlp_model,
+        "analysis": admission.stats(),
+    }
+
 @app.get("/dashboard-summary")
 def get_dashboard_summary():
-    if latest_log_analysis is not None:
+    if latest_log_session is not None:
+        return {
+            "analysisResults": latest_log_session.result(),
+            "lastAnalyzedAt": last_log_analysis_time,
+        }
+    elif latest_log_analysis is not None:
         return {
             "analysisResults": latest_log_analysis,
             "lastAnalyzedAt": last_log_analysis_time,
@@ -41,14 +162,55 @@ def get_dashboard_summary():
     else:
         return {"detail": "No analysis data available"}
 
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, sort: ProfileSort = Query("cumulative"), limit: int = Query(50, ge=1, le=1000),
+                raw: bool = Query(False)):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Профіль не знайдено")
+    if raw:
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return PlainTextResponse(profile_report(path, sort, limit))
+
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+@app.delete("/cache")
+def clear_cache():
+    result_cache.clear()
+    return {"detail": "Кеш очищено"}
+
 @app.post("/analyze")
-def analyze_logs(request: LogRequest):
+async def analyze_logs(request: LogRequest, response: Response,
+                       nlp_sample_chars: int = Query(NLP_SAMPLE_CHARS, ge=0)):
     global latest_analysis, last_analysis_time
     
+    timer = StageTimer()
     text = request.log_data
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    
-    analysis_data = perform_nlp_analysis(text, lines)
+
+    # Results computed without spaCy are not served once the model is installed.
+    nlp_model = MODEL_NAME if model_installed() else None
+    with timer.stage("cache"):
+        cache_key = await run_in_threadpool(ResultCache.make_key, "analyze", ANALYZER_VERSION, text, nlp=nlp_model,
+                                            nlp_sample_chars=nlp_sample_chars)
+        # A profiled request always runs the analysis.
+        analysis_data = None if profiling_requested() else result_cache.get(cache_key)
+
+    if analysis_data is not None:
+        response.headers["X-Cache"] = "HIT"
+    else:
+        with timer.stage("analysis"):
+            analysis_data, stages = await run_analysis(nlp_analysis_job, text, nlp_sample_chars)
+        observe_nlp_analysis("analyze", text, stages, timer.stages["analysis"])
+        timer.stages.update(stages)
+        result_cache.put(cache_key, analysis_data)
+        response.headers["X-Cache"] = "MISS"
+    response.headers["Server-Timing"] = timer.server_timing()
     
     latest_analysis = analysis_data
     last_analysis_time = datetime.utcnow().isoformat()
@@ -56,16 +218,250 @@ def analyze_logs(request: LogRequest):
     return analysis_data
 
 @app.post("/analyze-log")
-def analyze_log(data: LogData):
-    global latest_log_analysis, last_log_analysis_time
+async def analyze_log(data: LogData, response: Response, sniff_lines: int = Query(0, ge=0), workers: int = Query(1, ge=1),
+                      missing_timestamps: MissingTimestamps = Query("skip"),
+                      json_profile: str = Depends(json_profile_param),
+                      sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                      time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    global latest_log_analysis, latest_log_session, last_log_analysis_time
     
-    result = analyze_logs_structure(data.log_data)
+    # ``workers`` does not change the result (sharded parsing merges to the serial
+    # result, and runs serially when sniffing), so it is not part of the key.
+    cache_key = await run_in_threadpool(ResultCache.make_key, "analyze-log", ANALYZER_VERSION, data.log_data,
+                                       sniff_lines=sniff_lines, missing_timestamps=missing_timestamps,
+                                       json_fields=json_profiles[json_profile].fingerprint(), sketch_error=sketch_error,
+                                       time_resolution=time_resolution, store=store)
+    result = None if profiling_requested() else result_cache.get(cache_key)
+    # A cached result is only reused while its stored entries are still there.
+    if result is not None and store and await run_in_threadpool(entry_store.info, result["datasetId"]) is None:
+        result = None
+    if result is not None:
+        response.headers["X-Cache"] = "HIT"
+    else:
+        dataset_id = await run_in_threadpool(entry_store.create) if store else None
+        started = time.perf_counter()
+        if workers > 1:
+            # Fans out to the parse pool itself; only the coordination runs here.
+            profile = ParseProfile()
+            result = await run_analysis(analyze_logs_parallel, data.log_data, workers, sniff_lines, missing_timestamps,
+                                        json_profile, sketch_error, time_resolution, dataset_id, profile,
+                                        in_process=False)
+        else:
+            result, profile = await run_analysis(log_analysis_job, data.log_data, sniff_lines, missing_timestamps,
+                                                 json_profile, sketch_error, time_resolution, dataset_id)
+        observe_log_analysis("analyze-log", profile, time.perf_counter() - started)
+        if dataset_id is not None:
+            result["datasetId"] = dataset_id
+        result_cache.put(cache_key, result)
+        response.headers["X-Cache"] = "MISS"
     
     latest_log_analysis = result
+    latest_log_session = None
+    last_log_analysis_time = datetime.utcnow().isoformat()
+
+    return result
+
+@app.post("/analyze-log/upload")
+def analyze_log_upload(file: UploadFile = File(...), sniff_lines: int = Query(0, ge=0), missing_timestamps: MissingTimestamps = Query("skip"),
+                       json_profile: str = Depends(json_profile_param),
+                       sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                       time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    global latest_log_analysis, latest_log_session, last_log_analysis_time
+
+    writer = EntryWriter(entry_store.create()) if store else None
+    accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error, time_resolution,
+                                          writer)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    started = time.perf_counter()
+
+    try:
+        with admitted(), profiled():
+            while True:
+                chunk = file.file.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                accumulator.feed(decoder.decode(chunk))
+            accumulator.feed(decoder.decode(b"", final=True))
+            accumulator.close()
+    finally:
+        if writer is not None:
+            writer.close()
+    observe_log_analysis("upload", accumulator.profile, time.perf_counter() - started)
+
+    result = accumulator.result()
+    if writer is not None:
+        result["datasetId"] = writer.dataset_id
+
+    latest_log_analysis = result
+    latest_log_session = None
     last_log_analysis_time = datetime.utcnow().isoformat()
 
     return result
 
+@app.post("/analyze-log/stream")
+async def analyze_log_stream(request: Request, sniff_lines: int = Query(0, ge=0), missing_timestamps: MissingTimestamps = Query("skip"),
+                             json_profile: str = Depends(json_profile_param),
+                             sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                             time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    global latest_log_analysis, latest_log_session, last_log_analysis_time
+
+    writer = await run_in_threadpool(lambda: EntryWriter(entry_store.create())) if store else None
+    accumulator = LogStructureAccumulator(sniff_lines, missing_timestamps, json_profile, sketch_error, time_resolution,
+                                          writer)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = bytearray()
+    started = time.perf_counter()
+
+    try:
+        with admitted():
+            async for chunk in request.stream():
+                buffer.extend(chunk)
+                if len(buffer) >= STREAM_CHUNK_SIZE:
+                    await run_in_threadpool(run_profiled, accumulator.feed, decoder.decode(bytes(buffer)))
+                    buffer.clear()
+            await run_in_threadpool(run_profiled, accumulator.feed, decoder.decode(bytes(buffer), final=True))
+            await run_in_threadpool(run_profiled, accumulator.close)
+    finally:
+        if writer is not None:
+            writer.close()
+    observe_log_analysis("stream", accumulator.profile, time.perf_counter() - started)
+
+    result = accumulator.result()
+    if writer is not None:
+        result["datasetId"] = writer.dataset_id
+
+    latest_log_analysis = result
+    latest_log_session = None
+    last_log_analysis_time = datetime.utcnow().isoformat()
+
+    return result
+
+def get_session_or_404(session_id: str) -> AnalysisSession:
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сесію не знайдено")
+    return session
+
+@app.post("/sessions")
+def create_session(sniff_lines: int = Query(0, ge=0), missing_timestamps: MissingTimestamps = Query("skip"),
+                   json_profile: str = Depends(json_profile_param),
+                   sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                   time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    dataset_id = entry_store.create() if store else None
+    return session_store.create(sniff_lines, missing_timestamps, json_profile, sketch_error, time_resolution,
+                                dataset_id).info()
+
+@app.get("/sessions")
+def list_sessions():
+    return {"sessions": session_store.list(), "stats": session_store.stats()}
+
+@app.post("/sessions/{session_id}/append")
+def append_to_session(session_id: str, data: LogData):
+    global latest_log_session, last_log_analysis_time
+
+    session = get_session_or_404(session_id)
+    started = time.perf_counter()
+    with profiled():
+        profile = session.append(data.log_data)
+    observe_log_analysis("session", profile, time.perf_counter() - started)
+
+    latest_log_session = session
+    last_log_analysis_time = datetime.utcnow().isoformat()
+
+    return session.info()
+
+@app.get("/sessions/{session_id}")
+def get_session_result(session_id: str):
+    return get_session_or_404(session_id).result()
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    global latest_log_analysis, latest_log_session
+
+    session = session_store.delete(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сесію не знайдено")
+    if session is latest_log_session:
+        latest_log_analysis = session.result()
+        latest_log_session = None
+    return session.info()
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+    return job
+
+@app.post("/jobs/analyze", status_code=202)
+def submit_analyze_job(request: LogRequest, nlp_sample_chars: int = Query(NLP_SAMPLE_CHARS, ge=0)):
+    text = request.log_data
+    return job_manager.submit(Job("analyze", nlp_job_runner(text, nlp_sample_chars), len(text))).info()
+
+@app.post("/jobs/analyze-log", status_code=202)
+def submit_analyze_log_job(data: LogData, sniff_lines: int = Query(0, ge=0), missing_timestamps: MissingTimestamps = Query("skip"),
+                           json_profile: str = Depends(json_profile_param),
+                           sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                           time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    text = data.log_data
+    runner = log_job_runner(text_chunks(text), sniff_lines, missing_timestamps, json_profile, sketch_error,
+                            time_resolution, entry_store.create if store else None)
+    return job_manager.submit(Job("analyze-log", runner, len(text))).info()
+
+@app.post("/jobs/analyze-log/upload", status_code=202)
+def submit_analyze_log_upload_job(file: UploadFile = File(...), sniff_lines: int = Query(0, ge=0), missing_timestamps: MissingTimestamps = Query("skip"),
+                                  json_profile: str = Depends(json_profile_param),
+                                  sketch_error: float = Query(SKETCH_ERROR, ge=0, lt=1),
+                                  time_resolution: int = Query(TIME_SERIES_RESOLUTION, ge=0), store: bool = Query(False)):
+    # The upload is closed once this request ends, so the job reads its own copy.
+    fd, path = tempfile.mkstemp(prefix="log-analyzer-job-", suffix=".log")
+    os.close(fd)
+    chars = copy_text_file(file.file, path)
+    runner = log_job_runner(file_chunks(path), sniff_lines, missing_timestamps, json_profile, sketch_error,
+                            time_resolution, entry_store.create if store else None)
+    job = Job("analyze-log", runner, chars, remove_file(path))
+    return job_manager.submit(job).info()
+
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": job_manager.list(), "stats": job_manager.stats()}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return get_job_or_404(job_id).info()
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status not in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail="Завдання ще виконується")
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=410, detail=f"Завдання не має результату: {job.status}")
+    return job.result
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+    return job.info()
+
+@app.get("/entries/{dataset_id}")
+def query_entries(dataset_id: str, level: Optional[Level] = None, source: Optional[str] = None,
+                  hour: Optional[datetime] = None, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, template: Optional[str] = None,
+                  contains: Optional[str] = None, after: int = Query(-1, ge=-1), offset: int = Query(0, ge=0),
+                  limit: int = Query(100, ge=0, le=1000)):
+    result = entry_store.query(dataset_id, level, source, hour, template, contains, after, offset, limit, since, until)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Збережені записи не знайдено")
+    return result
+
+@app.delete("/entries/{dataset_id}")
+def delete_entries(dataset_id: str):
+    if not entry_store.delete(dataset_id):
+        raise HTTPException(status_code=404, detail="Збережені записи не знайдено")
+    return {"detail": "Збережені записи видалено"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.analyzers import parallel
+from app.analyzers.log_analyzer import analyze_logs_structure
+
+def build_log() -> str:
+    """Apache lines first, then mostly application lines, so a sniffer locks
+    onto apache on the head and later has to release the lock."""
+    lines = []
+    for i in range(3000):
+        second = f"{i % 60:02d}"
+        if i < 400 or i % 7 == 0:
+            lines.append(f'10.0.{i % 5}.{i % 250} - - [01/Mar/2024:10:{i // 60 % 60:02d}:{second} +0000] '
+                         f'"GET /page/{i % 40} HTTP/1.1" {500 if i % 11 == 0 else 200} {i % 900} "-" "curl/8.0"')
+        elif i % 5 == 0:
+            lines.append(f'{{"timestamp": "2024-03-01T11:00:{second}Z", "level": "WARN", "message": "slow {i % 13}"}}')
+        else:
+            level = "ERROR" if i % 9 == 0 else "INFO"
+            lines.append(f"2024-03-01 11:{i // 60 % 60:02d}:{second} [{level}] request {i % 17} handled")
+    return "\n".join(lines)
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    monkeypatch.setattr(parallel, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(parallel, "PARALLEL_MIN_BYTES", 0)
+    yield
+    parallel.shutdown_parse_pool()
+
+@pytest.mark.parametrize("sniff_lines", [0, 50])
+def test_parallel_matches_serial(two_workers, sniff_lines):
+    text = build_log()
+    serial = analyze_logs_structure(text, sniff_lines)
+    assert parallel.analyze_logs_parallel(text, 2, sniff_lines) == serial
+
+    chunks = [text[i:i + 10_000] for i in range(0, len(text), 10_000)]
+    assert parallel.analyze_chunks_parallel(chunks, sniff_lines, shard_chars=30_000) == serial
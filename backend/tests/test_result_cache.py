@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+import main
+from app.utils.result_cache import ResultCache
+
+LOG_DATA = "\n".join([
+    '192.168.1.10 - - [01/Mar/2024:10:00:00 +0000] "GET /index.html HTTP/1.1" 200 512 "-" "curl/8.0"',
+    "2024-03-01 10:00:01 ERROR [db] Connection timeout after 30s",
+    "2024-03-01 10:00:02 INFO [api] Request completed",
+    '{"timestamp": "2024-03-01T10:00:03Z", "level": "WARN", "message": "Slow query"}',
+])
+
+def test_disk_hit_round_trips(tmp_path, monkeypatch):
+    # No memory tier, so the second request can only be served from SQLite.
+    monkeypatch.setattr(main, "result_cache", ResultCache(0, str(tmp_path / "results.db")))
+    client = TestClient(main.app)
+
+    first = client.post("/analyze-log", json={"log_data": LOG_DATA})
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    assert first.json()["entries"]
+
+    second = client.post("/analyze-log", json={"log_data": LOG_DATA})
+    assert second.status_code == 200
+    assert second.headers["X-Cache"] == "HIT"
+    assert main.result_cache.stats()["diskHits"] == 1
+    assert second.json() == first.json()
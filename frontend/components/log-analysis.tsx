@@ -14,7 +14,7 @@ interface LogAnalysisProps {
 }
 
 interface LogEntry {
-  timestamp: string
+  timestamp: string | null
   level: "ERROR" | "WARN" | "INFO" | "DEBUG"
   message: string
   source?: string
@@ -182,7 +182,7 @@ export function LogAnalysis({ logData, onAnalysisComplete }: LogAnalysisProps) {
                         <div className="flex-1 min-w-0">
                           <div className="flex items-center gap-2 mb-1">
                             <Badge className={getLevelColor(entry.level)}>{entry.level}</Badge>
-                            <span className="text-xs text-gray-500">{entry.timestamp}</span>
+                            <span className="text-xs text-gray-500">{entry.timestamp ?? "без часу"}</span>
                           </div>
                           <p className="text-sm font-mono text-gray-800 break-words">{entry.message}</p>
                         </div>